@@ -11,7 +11,8 @@ from recipes.models import (
     ShoppingCart,
     Tag
 )
-
+from recipes.tasks import update_similar_recipes
+from tasks.models import Task
 from users.models import User
 
 
@@ -88,6 +89,28 @@ class RecipeAdmin(admin.ModelAdmin):
     readonly_fields = ('get_favorite_count',)
     form = RecipeForm
 
+    def save_model(self, request, obj, form, change):
+        """
+        При изменении сохраняет только редактируемые поля рецепта.
+        """
+        if change:
+            obj.save_editable()
+        else:
+            super().save_model(request, obj, form, change)
+
+    def save_related(self, request, form, formsets, change):
+        """
+        Пересчитывает похожие рецепты, если изменились
+        ингредиенты или теги.
+        """
+        super().save_related(request, form, formsets, change)
+        if (
+            not change
+            or 'tags' in form.changed_data
+            or any(formset.has_changed() for formset in formsets)
+        ):
+            update_similar_recipes.enqueue(form.instance.pk)
+
     def display_tags(self, obj):
         return ', '.join(
             tag['name'] for tag in obj.tags.values()
@@ -95,7 +118,7 @@ class RecipeAdmin(admin.ModelAdmin):
     display_tags.short_description = 'Теги'
 
     def get_favorite_count(self, obj):
-        return obj.favorite_recipes.count()
+        return obj.favorites_count
     get_favorite_count.short_description = (
         'Количество добавлений рецепта в избранное.'
     )
@@ -151,9 +174,33 @@ class ShoppingCartAdmin(admin.ModelAdmin):
     )
 
 
+class TaskAdmin(admin.ModelAdmin):
+    """
+    Просмотр отложенных задач.
+    """
+    list_display = (
+        'name',
+        'status',
+        'attempts',
+        'run_at',
+        'finished'
+    )
+    list_filter = (
+        'status',
+        'name'
+    )
+    readonly_fields = (
+        'created',
+        'started',
+        'finished',
+        'error'
+    )
+
+
 admin.site.register(User, CustomUserAdmin)
 admin.site.register(Recipe, RecipeAdmin)
 admin.site.register(Tag, TagAdmin)
 admin.site.register(Ingredient, IngredientAdmin)
 admin.site.register(FavoriteRecipe, FavoriteRecipeAdmin)
 admin.site.register(ShoppingCart, ShoppingCartAdmin)
+admin.site.register(Task, TaskAdmin)
@@ -0,0 +1,166 @@
+import logging
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+
+from users.authentication import token_cache
+
+logger = logging.getLogger('foodgram.performance')
+
+
+class RequestTiming:
+    """
+    Счетчик запросов к БД и времени их выполнения в рамках
+    одного HTTP-запроса.
+    """
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_duration = 0.0
+        self.serialize_duration = 0.0
+        self.serialize_db_duration = 0.0
+        self.action = None
+        self.view_finished = None
+        self.view_db_duration = None
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_duration += time.perf_counter() - started
+            self.queries += 1
+
+    @contextmanager
+    def measure_serialize(self):
+        """
+        Замеряет сериализацию. Запросы к БД во время сериализации
+        учитываются в db, а не в serialize.
+        """
+        started = time.perf_counter()
+        db_duration = self.db_duration
+        try:
+            yield
+        finally:
+            self.serialize_duration += time.perf_counter() - started
+            self.serialize_db_duration += self.db_duration - db_duration
+
+    def finish_view(self):
+        self.view_finished = time.perf_counter()
+        self.view_db_duration = self.db_duration
+
+    def get_header(self, finished):
+        """
+        Возвращает значение заголовка Server-Timing.
+
+        serialize - время получения serializer.data без запросов к БД,
+        view - остальное время работы представления без запросов
+        к БД: проверка прав, фильтрация, пагинация.
+        """
+        if self.view_finished is None:
+            self.finish_view()
+        serialize = max(
+            self.serialize_duration - self.serialize_db_duration, 0
+        )
+        view = max(
+            self.view_finished - self.started - self.view_db_duration
+            - serialize,
+            0
+        )
+        metrics = (
+            ('db', self.db_duration),
+            ('serialize', serialize),
+            ('view', view),
+            ('render', finished - self.view_finished),
+            ('total', finished - self.started),
+        )
+        return ', '.join(
+            f'{name};dur={duration * 1000:.1f}'
+            for name, duration in metrics
+        )
+
+
+def time_serializer(request, serializer):
+    """
+    Включает сериализатор в метрику serialize: замеряется вызов
+    to_representation при обращении к serializer.data.
+    """
+    timing = getattr(request, 'timing', None)
+    if timing is None:
+        return serializer
+    to_representation = serializer.to_representation
+
+    def timed_to_representation(instance):
+        with timing.measure_serialize():
+            return to_representation(instance)
+
+    serializer.to_representation = timed_to_representation
+    return serializer
+
+
+class ServerTimingMixin:
+    """
+    Миксин для представлений: замеряет сериализаторы
+    из get_serializer для метрики serialize.
+    """
+    def get_serializer(self, *args, **kwargs):
+        return time_serializer(
+            self.request, super().get_serializer(*args, **kwargs)
+        )
+
+
+class ServerTimingMiddleware:
+    """
+    Считает запросы к БД и замеряет время обработки запроса.
+
+    Запросы, выполнившие больше QUERY_BUDGET запросов к БД,
+    пишутся в лог вместе с именем действия представления.
+    Заголовки Server-Timing, X-DB-Queries и X-Token-Cache (счетчики
+    кэша токенов процесса) добавляются, если включена настройка
+    SERVER_TIMING_ENABLED или запрос выполнил сотрудник: это
+    известно только после авторизации в представлении.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timing = request.timing = RequestTiming()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(timing))
+            response = self.get_response(request)
+        finished = time.perf_counter()
+
+        if timing.queries > settings.QUERY_BUDGET:
+            logger.warning(
+                '%s %s (%s): %d запросов к БД за %.1f мс',
+                request.method,
+                request.path,
+                timing.action,
+                timing.queries,
+                timing.db_duration * 1000,
+            )
+        user = getattr(request, 'user', None)
+        if settings.SERVER_TIMING_ENABLED or getattr(user, 'is_staff', False):
+            response['Server-Timing'] = timing.get_header(finished)
+            response['X-DB-Queries'] = str(timing.queries)
+            response['X-Token-Cache'] = ', '.join(
+                f'{name}={value}'
+                for name, value in token_cache.stats().items()
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view_class = getattr(view_func, 'cls', None)
+        if view_class is not None:
+            method = request.method.lower()
+            action = (getattr(view_func, 'actions', None) or {}).get(
+                method, method
+            )
+            request.timing.action = f'{view_class.__name__}.{action}'
+
+    def process_template_response(self, request, response):
+        request.timing.finish_view()
+        return response
@@ -27,10 +27,12 @@ INSTALLED_APPS = [
     'djoser',
     'recipes.apps.RecipesConfig',
     'users.apps.UsersConfig',
+    'tasks.apps.TasksConfig',
     'api.apps.ApiConfig',
 ]
 
 MIDDLEWARE = [
+    'api.middleware.ServerTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -71,6 +73,23 @@ DATABASES = {
     }
 }
 
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            default='django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', default=''),
+    }
+}
+
+LOCAL_CACHE_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+CACHE_SHARED = CACHES['default']['BACKEND'] not in LOCAL_CACHE_BACKENDS
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': (
@@ -125,7 +144,7 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.AllowAny',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'users.authentication.CachedTokenAuthentication',
     ],
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend'
@@ -134,6 +153,8 @@ REST_FRAMEWORK = {
     'PAGE_SIZE': 6,
 }
 
+PAGE_SIZE_MAX = 100
+
 DJOSER = {
     'HIDE_USERS': False,
     'LOGIN_FIELD': 'email',
@@ -157,4 +178,79 @@ AMOUNT_MIN = 1
 
 AMOUNT_MAX = 100000
 
+SEARCH_CONFIG = 'russian'
+
+CATALOG_CACHE_TIMEOUT = 60 * 60 * 24
+
+INGREDIENT_INDEX_TTL = 300
+
+INGREDIENTS_LIMIT_MAX = 100
+
+IMPORT_BATCH_SIZE = 1000
+
 SHOPPING_CART_FILENAME = 'shopping_cart.txt'
+
+BATCH_RECIPES_MAX = 100
+
+FEED_TIMELINE_LENGTH = 500
+
+FEED_FANOUT_MAX_FOLLOWERS = 10000
+
+FEED_FANOUT_BATCH_SIZE = 1000
+
+FEED_PULL_AUTHORS_TIMEOUT = 300
+
+SIMILAR_RECIPES_COUNT = 10
+
+SIMILAR_TAG_WEIGHT = 0.5
+
+SIMILAR_BLOCK_SIZE = 256
+
+SIMILAR_CANDIDATES_MAX = 5000
+
+SIMILAR_UPDATE_INTERVAL = 60 * 60 * 24
+
+COOKABLE_INDEX_TTL = 60 * 60
+
+COOKABLE_INGREDIENTS_MAX = 100
+
+SHOPPING_CART_CHUNK_SIZE = 500
+
+SHOPPING_CART_PDF_FONT = os.getenv(
+    'SHOPPING_CART_PDF_FONT',
+    default='/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf'
+)
+
+SERVER_TIMING_ENABLED = os.getenv('SERVER_TIMING_ENABLED') == 'True'
+
+QUERY_BUDGET = int(os.getenv('QUERY_BUDGET', default=20))
+
+IMAGE_VARIANT_WIDTHS = (320, 640, 1280)
+
+IMAGE_VARIANT_FORMATS = ('webp', 'jpeg')
+
+IMAGE_VARIANT_QUALITY = 80
+
+TASK_WORKERS = int(os.getenv('TASK_WORKERS', default=2))
+
+TASK_POLL_INTERVAL = 1
+
+TASK_MAX_ATTEMPTS = 3
+
+TASK_RETRY_DELAY = 10
+
+TASK_TIMEOUT = 600
+
+TASK_SCHEDULE_INTERVAL = 60
+
+TASK_RETENTION = 60 * 60 * 24 * 7
+
+TASK_PURGE_INTERVAL = 60 * 60
+
+TASK_PURGE_BATCH_SIZE = 1000
+
+TOKEN_CACHE_SIZE = 10000
+
+TOKEN_CACHE_TIMEOUT = 60
+
+TOKEN_VERSION_CHECK_INTERVAL = 5
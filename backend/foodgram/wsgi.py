@@ -5,3 +5,9 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'foodgram.settings')
 
 application = get_wsgi_application()
+
+from recipes.cookable_index import cookable_index  # noqa: E402
+from recipes.ingredient_index import ingredient_index  # noqa: E402
+
+ingredient_index.warm_up()
+cookable_index.warm_up()
@@ -7,3 +7,6 @@ class RecipesConfig(AppConfig):
     """
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'recipes'
+
+    def ready(self):
+        import recipes.signals  # noqa: F401
@@ -0,0 +1,98 @@
+import hashlib
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+CATALOG_VERSION_KEY = 'catalog:version'
+CATALOG_RESPONSE_KEY = 'catalog:response:{}'
+
+
+def new_catalog_version():
+    return {
+        'token': uuid.uuid4().hex,
+        'last_modified': int(time.time()),
+    }
+
+
+def get_catalog_version():
+    """
+    Возвращает текущую версию справочников (тегов и ингредиентов).
+    """
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        cache.add(CATALOG_VERSION_KEY, new_catalog_version(), None)
+        version = cache.get(CATALOG_VERSION_KEY)
+    return version
+
+
+def bump_catalog_version():
+    """
+    Меняет версию справочников после изменения тегов или ингредиентов.
+    """
+    cache.set(CATALOG_VERSION_KEY, new_catalog_version(), None)
+
+
+class CatalogCacheMixin:
+    """
+    Миксин для представлений справочников.
+
+    Добавляет к ответам ETag и Last-Modified по версии справочников,
+    отвечает 304 на совпадающий If-None-Match без запросов к БД
+    и сериализации, а готовое тело JSON-ответа хранит в кэше.
+    Тело кэшируется только в общем кэше (CACHE_SHARED), с кэшем
+    в памяти процесса работают только ETag и 304.
+    """
+    def list(self, request, *args, **kwargs):
+        return self.get_catalog_response(
+            super().list, request, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_catalog_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
+    def get_catalog_response(self, handler, request, *args, **kwargs):
+        """
+        Возвращает 304 или ответ с ETag по версии справочников.
+        Тело кэшируется, только если кэш общий для всех процессов:
+        иначе процесс отдавал бы тело, закэшированное до изменения
+        в другом процессе.
+        """
+        renderer = request.accepted_renderer
+        if renderer.format != 'json':
+            return handler(request, *args, **kwargs)
+        version = get_catalog_version()
+        etag = quote_etag(hashlib.md5(
+            f'{version["token"]}:{request.get_full_path()}'.encode()
+        ).hexdigest())
+        last_modified = version['last_modified']
+
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            key = CATALOG_RESPONSE_KEY.format(etag)
+            content = cache.get(key) if settings.CACHE_SHARED else None
+            if content is None:
+                data = handler(request, *args, **kwargs).data
+                content = renderer.render(
+                    data,
+                    request.accepted_media_type,
+                    self.get_renderer_context()
+                )
+                if settings.CACHE_SHARED:
+                    cache.set(
+                        key, content, settings.CATALOG_CACHE_TIMEOUT
+                    )
+            response = HttpResponse(
+                content, content_type=renderer.media_type
+            )
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        return response
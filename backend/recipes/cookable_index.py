@@ -0,0 +1,192 @@
+import threading
+import time
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError
+
+from recipes.models import RecipeIngredient
+
+VERSION_KEY = 'cookable:version'
+CHANGE_KEY = 'cookable:change:{}'
+
+
+def get_index_version():
+    """
+    Возвращает номер последнего изменения состава рецептов.
+    """
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, 0, None)
+        version = cache.get(VERSION_KEY, 0)
+    return version
+
+
+def publish_recipe_change(recipe_id):
+    """
+    Записывает в кэш изменение состава рецепта. Процессы применяют
+    изменения к своим индексам при следующем поиске.
+    """
+    cache.add(VERSION_KEY, 0, None)
+    version = cache.incr(VERSION_KEY)
+    cache.set(
+        CHANGE_KEY.format(version), recipe_id, settings.COOKABLE_INDEX_TTL
+    )
+
+
+class CookableIndex:
+    """
+    Инвертированный индекс ингредиентов рецептов в памяти процесса.
+
+    Для каждого ингредиента хранится отсортированный массив id
+    рецептов, для каждого рецепта - отсортированный массив id
+    ингредиентов. Поиск считает совпадения только по найденным
+    спискам рецептов, его стоимость не зависит от числа рецептов.
+    Изменения рецептов применяются к индексу по журналу в кэше,
+    полностью индекс перестраивается, если журнал потерян,
+    и не реже, чем раз в COOKABLE_INDEX_TTL секунд. Без общего
+    кэша (CACHE_SHARED) журнал виден только процессу, изменившему
+    рецепт: остальные процессы увидят изменение после перестроения.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._postings = None
+        self._recipes = None
+        self._version = None
+        self._built_at = 0
+
+    def build(self):
+        """
+        Строит индекс по всем ингредиентам рецептов из БД.
+        """
+        version = get_index_version()
+        rows = np.array(
+            list(RecipeIngredient.objects.order_by(
+                'ingredient_id', 'recipe_id'
+            ).values_list('ingredient_id', 'recipe_id').iterator()),
+            dtype=np.int64
+        ).reshape(-1, 2)
+        ingredient_ids, starts = np.unique(rows[:, 0], return_index=True)
+        postings = dict(zip(
+            ingredient_ids.tolist(), np.split(rows[:, 1], starts[1:])
+        ))
+        rows = rows[np.lexsort((rows[:, 0], rows[:, 1]))]
+        recipe_ids, starts = np.unique(rows[:, 1], return_index=True)
+        recipes = dict(zip(
+            recipe_ids.tolist(), np.split(rows[:, 0], starts[1:])
+        ))
+        with self._lock:
+            self._postings = postings
+            self._recipes = recipes
+            self._version = version
+            self._built_at = time.monotonic()
+
+    def warm_up(self):
+        """
+        Строит индекс при старте процесса, если БД уже доступна.
+        """
+        try:
+            self.build()
+        except DatabaseError:
+            pass
+
+    def sync(self):
+        """
+        Применяет изменения из журнала или перестраивает индекс.
+        """
+        version = get_index_version()
+        with self._lock:
+            current = self._version
+            expired = (
+                time.monotonic() - self._built_at
+                > settings.COOKABLE_INDEX_TTL
+            )
+        if current == version and not expired:
+            return
+        if current is None or expired or version < current:
+            self.build()
+            return
+        keys = [
+            CHANGE_KEY.format(number)
+            for number in range(current + 1, version + 1)
+        ]
+        changes = cache.get_many(keys)
+        if len(changes) != len(keys):
+            self.build()
+            return
+        self.apply(set(changes.values()), version)
+
+    def apply(self, recipe_ids, version):
+        """
+        Обновляет в индексе ингредиенты переданных рецептов.
+        """
+        stored = {}
+        for recipe_id, ingredient_id in RecipeIngredient.objects.filter(
+            recipe_id__in=recipe_ids
+        ).values_list('recipe_id', 'ingredient_id'):
+            stored.setdefault(recipe_id, []).append(ingredient_id)
+        empty = np.zeros(0, dtype=np.int64)
+        with self._lock:
+            for recipe_id in recipe_ids:
+                new = np.unique(
+                    np.array(stored.get(recipe_id, ()), dtype=np.int64)
+                )
+                old = self._recipes.pop(recipe_id, empty)
+                for ingredient_id in np.setdiff1d(old, new).tolist():
+                    posting = self._postings[ingredient_id]
+                    self._postings[ingredient_id] = posting[
+                        posting != recipe_id
+                    ]
+                for ingredient_id in np.setdiff1d(new, old).tolist():
+                    posting = self._postings.get(ingredient_id, empty)
+                    self._postings[ingredient_id] = np.insert(
+                        posting,
+                        np.searchsorted(posting, recipe_id),
+                        recipe_id
+                    )
+                if len(new):
+                    self._recipes[recipe_id] = new
+            self._version = version
+
+    def search(self, ingredient_ids, max_missing=None):
+        """
+        Возвращает id рецептов, в которых есть хотя бы один
+        из ингредиентов, и для каждого - количество имеющихся
+        и недостающих ингредиентов.
+
+        Рецепты упорядочены по числу недостающих ингредиентов,
+        затем по числу имеющихся и от новых к старым.
+        """
+        self.sync()
+        with self._lock:
+            postings = [
+                self._postings[ingredient_id]
+                for ingredient_id in set(ingredient_ids)
+                if ingredient_id in self._postings
+            ]
+            if not postings:
+                return [], [], []
+            recipe_ids, available = np.unique(
+                np.concatenate(postings), return_counts=True
+            )
+            sizes = np.fromiter(
+                (len(self._recipes[pk]) for pk in recipe_ids.tolist()),
+                dtype=np.int64,
+                count=len(recipe_ids)
+            )
+            missing = sizes - available
+        if max_missing is not None:
+            keep = missing <= max_missing
+            recipe_ids = recipe_ids[keep]
+            available = available[keep]
+            missing = missing[keep]
+        order = np.lexsort((-recipe_ids, -available, missing))
+        return (
+            recipe_ids[order].tolist(),
+            available[order].tolist(),
+            missing[order].tolist(),
+        )
+
+
+cookable_index = CookableIndex()
@@ -0,0 +1,189 @@
+import json
+import os
+import shutil
+from contextlib import contextmanager
+from datetime import datetime
+
+from django.contrib.postgres.search import SearchVectorField
+from django.core.files.storage import default_storage
+from django.core.management.color import no_style
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, models, transaction
+
+from recipes.images import iter_variants
+from recipes.models import (FavoriteRecipe, Ingredient, Recipe,
+                            RecipeIngredient, ShoppingCart, Tag, TagRecipe)
+from recipes.search import update_search_vector
+from users.models import SubscribeUser, User
+
+
+class DumpEncoder(DjangoJSONEncoder):
+    """
+    JSON-кодировщик, сохраняющий даты с точностью до микросекунд.
+    """
+    def default(self, o):
+        if isinstance(o, datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+def get_dump_models():
+    """
+    Возвращает модели для выгрузки в порядке зависимостей.
+    """
+    return (
+        User,
+        Tag,
+        Ingredient,
+        Recipe,
+        Recipe.tags.through,
+        RecipeIngredient,
+        TagRecipe,
+        FavoriteRecipe,
+        ShoppingCart,
+        SubscribeUser,
+    )
+
+
+def get_dump_fields(model):
+    """
+    Возвращает сохраняемые поля модели. Поисковый вектор
+    не выгружается, он пересчитывается при загрузке.
+    """
+    return [
+        field for field in model._meta.concrete_fields
+        if not isinstance(field, SearchVectorField)
+    ]
+
+
+def export_rows(file, chunk_size, media_dir=None):
+    """
+    Пишет строки NDJSON для всех моделей, читая таблицы
+    итератором. Возвращает количество выгруженных объектов по моделям.
+    """
+    encoder = DumpEncoder(ensure_ascii=False)
+    counts = {}
+    for model in get_dump_models():
+        label = model._meta.label_lower
+        fields = get_dump_fields(model)
+        names = [field.attname for field in fields]
+        rows = model._base_manager.order_by('pk').values_list(
+            *names
+        ).iterator(chunk_size=chunk_size)
+        counts[label] = 0
+        for values in rows:
+            row = dict(zip(names, values))
+            file.write(encoder.encode({'model': label, 'fields': row}))
+            file.write('\n')
+            if media_dir:
+                copy_files(model, row, default_storage.path, media_dir)
+            counts[label] += 1
+    return counts
+
+
+def get_file_names(model, row):
+    """
+    Возвращает имена файлов, на которые ссылается объект:
+    файловые поля и уменьшенные копии изображения рецепта.
+    """
+    names = [
+        row.get(field.attname)
+        for field in model._meta.concrete_fields
+        if isinstance(field, models.FileField)
+    ]
+    if model is Recipe:
+        names += [
+            name for _, _, name in iter_variants(
+                row.get('image_variants') or {}
+            )
+        ]
+    return [name for name in names if name]
+
+
+def copy_files(model, row, source_path, target_dir):
+    """
+    Копирует файлы, на которые ссылается объект.
+    """
+    for name in get_file_names(model, row):
+        source = source_path(name)
+        if not os.path.exists(source):
+            continue
+        target = os.path.join(target_dir, name)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        shutil.copyfile(source, target)
+
+
+@contextmanager
+def keep_auto_dates(model):
+    """
+    Отключает auto_now и auto_now_add, чтобы при загрузке
+    сохранялись даты из выгрузки.
+    """
+    changed = []
+    for field in model._meta.concrete_fields:
+        for option in ('auto_now', 'auto_now_add'):
+            if getattr(field, option, False):
+                setattr(field, option, False)
+                changed.append((field, option))
+    try:
+        yield
+    finally:
+        for field, option in changed:
+            setattr(field, option, True)
+
+
+def load_batch(model, batch, ignore_conflicts):
+    with keep_auto_dates(model), transaction.atomic():
+        model._base_manager.bulk_create(
+            batch, ignore_conflicts=ignore_conflicts
+        )
+
+
+def import_rows(file, batch_size, ignore_conflicts=False, media_dir=None):
+    """
+    Загружает строки NDJSON пачками по batch_size объектов.
+    Возвращает количество загруженных объектов по моделям.
+    """
+    allowed = {
+        model._meta.label_lower: model for model in get_dump_models()
+    }
+    fields = {
+        label: {field.attname: field for field in get_dump_fields(model)}
+        for label, model in allowed.items()
+    }
+    counts = {}
+    model, batch = None, []
+    for line in file:
+        if not line.strip():
+            continue
+        data = json.loads(line)
+        label = data['model']
+        if label not in allowed:
+            raise ValueError(f'Неизвестная модель: {label}.')
+        if allowed[label] is not model or len(batch) >= batch_size:
+            if batch:
+                load_batch(model, batch, ignore_conflicts)
+            model, batch = allowed[label], []
+        model_fields = fields[label]
+        batch.append(model(**{
+            name: model_fields[name].to_python(value)
+            for name, value in data['fields'].items()
+        }))
+        if media_dir:
+            copy_files(
+                model,
+                data['fields'],
+                lambda name: os.path.join(media_dir, name),
+                default_storage.location
+            )
+        counts[label] = counts.get(label, 0) + 1
+    if batch:
+        load_batch(model, batch, ignore_conflicts)
+
+    loaded = [allowed[label] for label in counts]
+    with connection.cursor() as cursor:
+        for sql in connection.ops.sequence_reset_sql(no_style(), loaded):
+            cursor.execute(sql)
+    if Recipe in loaded:
+        update_search_vector(Recipe.objects.all())
+    return counts
@@ -0,0 +1,159 @@
+from itertools import islice
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, OuterRef, Subquery
+
+from recipes.models import Recipe, TimelineEntry
+from recipes.pagination import RecipePagination, seek
+from users.models import SubscribeUser
+
+PULL_AUTHORS_CACHE_KEY = 'feed:pull_authors'
+
+
+def get_pull_authors():
+    """
+    Возвращает id авторов, у которых больше FEED_FANOUT_MAX_FOLLOWERS
+    подписчиков. Их рецепты не копируются в ленты, а читаются
+    при запросе ленты.
+    """
+    authors = cache.get(PULL_AUTHORS_CACHE_KEY)
+    if authors is None:
+        authors = set(
+            SubscribeUser.objects.values('target_user').annotate(
+                followers=Count('id')
+            ).filter(
+                followers__gt=settings.FEED_FANOUT_MAX_FOLLOWERS
+            ).values_list('target_user', flat=True)
+        )
+        cache.set(
+            PULL_AUTHORS_CACHE_KEY, authors, settings.FEED_PULL_AUTHORS_TIMEOUT
+        )
+    return authors
+
+
+def trim_timelines(user_ids):
+    """
+    Удаляет из лент записи старше FEED_TIMELINE_LENGTH последних.
+    """
+    cutoff = TimelineEntry.objects.filter(
+        user=OuterRef('user')
+    ).order_by('-pub_date', '-recipe').values('pub_date')[
+        settings.FEED_TIMELINE_LENGTH - 1:settings.FEED_TIMELINE_LENGTH
+    ]
+    TimelineEntry.objects.filter(
+        user_id__in=user_ids,
+        pub_date__lt=Subquery(cutoff),
+    ).delete()
+
+
+def fan_out_recipe(recipe_id):
+    """
+    Добавляет рецепт в ленты подписчиков автора пачками
+    по FEED_FANOUT_BATCH_SIZE пользователей.
+    """
+    recipe = Recipe.objects.filter(pk=recipe_id).values(
+        'author_id', 'pub_date'
+    ).first()
+    if recipe is None or recipe['author_id'] in get_pull_authors():
+        return
+    followers = SubscribeUser.objects.filter(
+        target_user_id=recipe['author_id']
+    ).order_by('subscriber_id').values_list(
+        'subscriber_id', flat=True
+    ).iterator(chunk_size=settings.FEED_FANOUT_BATCH_SIZE)
+    while True:
+        user_ids = list(islice(followers, settings.FEED_FANOUT_BATCH_SIZE))
+        if not user_ids:
+            break
+        with transaction.atomic():
+            TimelineEntry.objects.bulk_create(
+                (
+                    TimelineEntry(
+                        user_id=user_id,
+                        recipe_id=recipe_id,
+                        pub_date=recipe['pub_date'],
+                    )
+                    for user_id in user_ids
+                ),
+                ignore_conflicts=True
+            )
+            trim_timelines(user_ids)
+
+
+def fill_timeline(user_id, author_ids):
+    """
+    Добавляет в ленту пользователя последние рецепты авторов.
+    """
+    author_ids = set(author_ids) - get_pull_authors()
+    if not author_ids:
+        return
+    recipes = Recipe.objects.filter(
+        author_id__in=author_ids
+    ).order_by('-pub_date', '-id').values_list(
+        'id', 'pub_date'
+    )[:settings.FEED_TIMELINE_LENGTH]
+    with transaction.atomic():
+        TimelineEntry.objects.bulk_create(
+            (
+                TimelineEntry(
+                    user_id=user_id,
+                    recipe_id=recipe_id,
+                    pub_date=pub_date,
+                )
+                for recipe_id, pub_date in recipes
+            ),
+            ignore_conflicts=True
+        )
+        trim_timelines((user_id,))
+
+
+def get_feed_keys(user, position, limit):
+    """
+    Возвращает до limit пар (pub_date, id) рецептов ленты после
+    позиции курсора, от новых к старым.
+
+    Записи ленты читаются из TimelineEntry, рецепты авторов
+    с большим числом подписчиков - напрямую из Recipe.
+    """
+    keys = set(
+        seek(
+            TimelineEntry.objects.filter(user=user),
+            position,
+            id_field='recipe_id'
+        ).values_list('pub_date', 'recipe_id')[:limit]
+    )
+    pull_authors = get_pull_authors()
+    if pull_authors:
+        followed = SubscribeUser.objects.filter(
+            subscriber=user,
+            target_user_id__in=pull_authors
+        ).values('target_user_id')
+        keys.update(
+            seek(
+                Recipe.objects.filter(author_id__in=followed),
+                position
+            ).values_list('pub_date', 'id')[:limit]
+        )
+    reverse = position is not None and position[2]
+    return sorted(keys, reverse=not reverse)[:limit]
+
+
+class FeedPagination(RecipePagination):
+    """
+    Курсорная пагинация ленты подписок. Ключи страницы берутся
+    из get_feed_keys, рецепты загружаются одним запросом.
+    """
+    def paginate_queryset(self, queryset, request, view=None):
+        self.use_cursor = True
+        self.request = request
+        page_size = self.get_page_size(request)
+        position = self.decode_cursor(request)
+        keys = get_feed_keys(request.user, position, page_size + 1)
+        recipes = {
+            recipe.pk: recipe
+            for recipe in queryset.filter(id__in=[pk for _, pk in keys])
+        }
+        results = [recipes[pk] for _, pk in keys if pk in recipes]
+        return self.get_cursor_page(results, position, page_size)
@@ -0,0 +1,17 @@
+from rest_framework import serializers
+
+from recipes.images import get_variant_urls
+
+
+class ImageVariantsField(serializers.Field):
+    """
+    Поле со ссылками на уменьшенные копии изображения рецепта:
+    {формат: {ширина: url}}, по аналогии с атрибутом srcset.
+    """
+    def __init__(self, **kwargs):
+        kwargs['source'] = '*'
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        return get_variant_urls(value, self.context.get('request'))
@@ -1,6 +1,18 @@
+from django.db.models import Exists, OuterRef
 from django_filters.rest_framework import FilterSet, filters
+from rest_framework.exceptions import ValidationError
 
-from recipes.models import Ingredient, Recipe, Tag
+from recipes.models import (FavoriteRecipe, Ingredient, Recipe,
+                            ShoppingCart, Tag)
+from recipes.pagination import RecipePagination
+from recipes.search import search_recipes
+
+TAGS_MODE_ANY = 'any'
+TAGS_MODE_ALL = 'all'
+TAGS_MODES = (
+    (TAGS_MODE_ANY, 'Хотя бы один из тегов'),
+    (TAGS_MODE_ALL, 'Все теги'),
+)
 
 
 class IngredientsFilter(FilterSet):
@@ -26,7 +38,12 @@ class RecipesFilter(FilterSet):
     tags = filters.ModelMultipleChoiceFilter(
         field_name='tags__slug',
         to_field_name='slug',
-        queryset=Tag.objects.all()
+        queryset=Tag.objects.all(),
+        method='filter_tags'
+    )
+    tags_mode = filters.ChoiceFilter(
+        choices=TAGS_MODES,
+        method='filter_tags_mode'
     )
     is_favorited = filters.BooleanFilter(
         method='filter_is_favorited'
@@ -34,30 +51,125 @@ class RecipesFilter(FilterSet):
     is_in_shopping_cart = filters.BooleanFilter(
         method='filter_is_in_shopping_cart'
     )
+    search = filters.CharFilter(
+        method='filter_search'
+    )
+    ordering = filters.OrderingFilter(
+        fields=(
+            'pub_date',
+            'favorites_count',
+        ),
+        method='filter_ordering'
+    )
+
+    def filter_tags(self, queryset, name, value):
+        """
+        Фильтрует рецепты по тегам подзапросами EXISTS к таблице связи,
+        без соединения и DISTINCT: рецепт с несколькими из тегов
+        попадает в выдачу один раз, сортировка по индексу сохраняется.
+
+        По умолчанию рецепт должен иметь хотя бы один из тегов,
+        с ?tags_mode=all - все теги.
+        """
+        tag_ids = {tag.id for tag in value}
+        if not tag_ids:
+            return queryset
+        recipe_tags = Recipe.tags.through.objects.filter(
+            recipe_id=OuterRef('pk')
+        )
+        if self.form.cleaned_data.get('tags_mode') != TAGS_MODE_ALL:
+            return queryset.filter(
+                Exists(recipe_tags.filter(tag_id__in=tag_ids))
+            )
+        for tag_id in tag_ids:
+            queryset = queryset.filter(
+                Exists(recipe_tags.filter(tag_id=tag_id))
+            )
+        return queryset
+
+    def filter_tags_mode(self, queryset, name, value):
+        """
+        Режим учитывается в filter_tags.
+        """
+        return queryset
+
+    def filter_user_recipes(self, queryset, model, value):
+        """
+        Оставляет рецепты, для которых у текущего пользователя есть
+        запись в model. Проверка идет подзапросом EXISTS по индексу
+        (user_id, recipe_id), поэтому остальные фильтры и сортировка
+        queryset сохраняются.
+        """
+        user = self.request.user
+        if not value or not user.is_authenticated:
+            return queryset
+        return queryset.filter(
+            Exists(model.objects.filter(user=user, recipe_id=OuterRef('pk')))
+        )
 
     def filter_is_favorited(self, queryset, name, value):
         """
         Фильтрует рецепты, которые пользователь добавил в избранное.
         """
-        if value and self.request.user.is_authenticated:
-            return self.request.user.favorite_recipes.all()
-        return queryset
+        return self.filter_user_recipes(queryset, FavoriteRecipe, value)
 
     def filter_is_in_shopping_cart(self, queryset, name, value):
         """
         Фильтрует рецепты, которые пользователь добавил в корзину покупок.
         """
-        if value and self.request.user.is_authenticated:
-            user_shopping_cart = self.request.user.user_shopping_cart
-            recipe_ids = user_shopping_cart.values_list('recipe_id', flat=True)
-            return queryset.filter(id__in=recipe_ids)
+        return self.filter_user_recipes(queryset, ShoppingCart, value)
+
+    def filter_search(self, queryset, name, value):
+        """
+        Ищет рецепты по названию и тексту, сортируя по релевантности.
+        Курсорная пагинация с поиском недоступна: курсор задает
+        порядок по дате, а поиск - по релевантности.
+        Если количество найденных рецептов известно заранее, оно
+        сохраняется в request.search_count для пагинации.
+        """
+        if not value.strip():
+            return queryset
+        if self.request is not None and (
+            RecipePagination.cursor_query_param in self.request.query_params
+        ):
+            raise ValidationError(
+                {'cursor': RecipePagination.invalid_search_message}
+            )
+        queryset, count = search_recipes(
+            queryset, value, self.get_search_limit()
+        )
+        if self.request is not None and count is not None:
+            self.request.search_count = count
         return queryset
 
+    def get_search_limit(self):
+        """
+        Возвращает число рецептов до конца запрошенной страницы.
+        С ?ordering= рецепты сортируются не по релевантности,
+        и нужны все найденные.
+        """
+        if self.request is None or 'ordering' in self.request.query_params:
+            return None
+        paginator = RecipePagination()
+        page = self.request.query_params.get(paginator.page_query_param)
+        page = int(page) if page and page.isdigit() and int(page) else 1
+        return page * paginator.get_page_size(self.request)
+
+    def filter_ordering(self, queryset, name, value):
+        """
+        Сортирует рецепты по выбранным полям, при равенстве —
+        по дате публикации.
+        """
+        return queryset.order_by(*value, '-pub_date', '-id')
+
     class Meta:
         model = Recipe
         fields = (
             'author',
             'tags',
+            'tags_mode',
             'is_favorited',
             'is_in_shopping_cart',
+            'search',
+            'ordering',
         )
@@ -0,0 +1,134 @@
+import io
+import os
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image
+
+EXTENSIONS = {'jpeg': 'jpg', 'webp': 'webp'}
+
+
+def get_variant_name(name, width, image_format):
+    """
+    Возвращает путь варианта изображения в хранилище.
+    """
+    directory, filename = os.path.split(name)
+    stem = os.path.splitext(filename)[0]
+    return os.path.join(
+        directory,
+        'variants',
+        f'{stem}_{width}.{EXTENSIONS[image_format]}'
+    )
+
+
+def create_variants(name):
+    """
+    Сохраняет уменьшенные копии изображения для каждой ширины
+    из IMAGE_VARIANT_WIDTHS, которая меньше исходной.
+
+    Возвращает словарь {'source': name, формат: {ширина: путь}}.
+    """
+    with default_storage.open(name) as file:
+        image = Image.open(file)
+        image.load()
+    image = image.convert('RGB')
+    variants = {'source': name}
+    for width in settings.IMAGE_VARIANT_WIDTHS:
+        if width >= image.width:
+            continue
+        height = round(image.height * width / image.width)
+        resized = image.resize((width, height), Image.LANCZOS)
+        for image_format in settings.IMAGE_VARIANT_FORMATS:
+            buffer = io.BytesIO()
+            resized.save(
+                buffer,
+                image_format,
+                quality=settings.IMAGE_VARIANT_QUALITY,
+                optimize=True,
+            )
+            variant_name = get_variant_name(name, width, image_format)
+            if default_storage.exists(variant_name):
+                default_storage.delete(variant_name)
+            variants.setdefault(image_format, {})[str(width)] = (
+                default_storage.save(
+                    variant_name, ContentFile(buffer.getvalue())
+                )
+            )
+    return variants
+
+
+def iter_variants(variants):
+    """
+    Выдает (формат, ширина, имя файла) для всех вариантов.
+    """
+    for image_format, names in variants.items():
+        if image_format == 'source':
+            continue
+        for width, name in names.items():
+            yield image_format, width, name
+
+
+def delete_variants(variants, keep=None):
+    """
+    Удаляет файлы вариантов, которых нет в keep.
+    """
+    keep = keep or {}
+    for image_format, width, name in iter_variants(variants):
+        if keep.get(image_format, {}).get(width) != name:
+            default_storage.delete(name)
+
+
+def generate_recipe_variants(recipe_id):
+    """
+    Создает варианты изображения рецепта и сохраняет их пути.
+
+    Если за время обработки изображение рецепта сменилось,
+    результат отбрасывается: варианты создаст следующий запуск.
+    """
+    from recipes.models import Recipe
+
+    recipe = Recipe.objects.only('image', 'image_variants').filter(
+        pk=recipe_id
+    ).first()
+    if recipe is None or not needs_variants(recipe):
+        return
+    variants = create_variants(recipe.image.name)
+    updated = Recipe.objects.filter(
+        pk=recipe_id, image=recipe.image.name
+    ).update(image_variants=variants)
+    if updated:
+        delete_variants(recipe.image_variants, keep=variants)
+    else:
+        delete_variants(variants)
+
+
+def needs_variants(recipe):
+    """
+    Возвращает True, если варианты текущего изображения
+    рецепта еще не созданы.
+    """
+    return bool(recipe.image) and (
+        recipe.image_variants.get('source') != recipe.image.name
+    )
+
+
+def get_variant_urls(recipe, request=None):
+    """
+    Возвращает ссылки на варианты изображения в виде
+    {формат: {ширина: url}}. Пока варианты текущего изображения
+    не созданы, возвращается пустой словарь.
+    """
+    if needs_variants(recipe):
+        return {}
+    urls = {}
+    for image_format, names in recipe.image_variants.items():
+        if image_format == 'source':
+            continue
+        urls[image_format] = {}
+        for width, name in names.items():
+            url = default_storage.url(name)
+            if request is not None:
+                url = request.build_absolute_uri(url)
+            urls[image_format][width] = url
+    return urls
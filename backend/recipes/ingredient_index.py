@@ -0,0 +1,97 @@
+import bisect
+import threading
+import time
+
+from django.conf import settings
+from django.db import DatabaseError
+
+from recipes.catalog import get_catalog_version
+from recipes.models import Ingredient
+
+MAX_CHAR = chr(0x10FFFF)
+
+
+class IngredientIndex:
+    """
+    Индекс ингредиентов в памяти процесса для поиска по началу названия.
+
+    Названия хранятся в отсортированном массиве в casefold-виде,
+    поиск по префиксу выполняется бинарным поиском без запросов к БД.
+    Индекс перестраивается при следующем поиске после смены версии
+    справочников в кэше (ее меняют сигналы изменения ингредиентов)
+    и не реже, чем раз в INGREDIENT_INDEX_TTL секунд.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._keys = None
+        self._items = None
+        self._built_at = 0
+        self._version = None
+
+    def build(self):
+        """
+        Строит индекс по всем ингредиентам из БД.
+        """
+        version = get_catalog_version()['token']
+        rows = sorted(
+            Ingredient.objects.values_list(
+                'id', 'name', 'measurement_unit'
+            ),
+            key=lambda row: (row[1].casefold(), row[0])
+        )
+        keys = [name.casefold() for _, name, _ in rows]
+        items = [
+            {'id': pk, 'name': name, 'measurement_unit': measurement_unit}
+            for pk, name, measurement_unit in rows
+        ]
+        with self._lock:
+            self._keys = keys
+            self._items = items
+            self._built_at = time.monotonic()
+            self._version = version
+        return keys, items
+
+    def warm_up(self):
+        """
+        Строит индекс при старте процесса, если БД уже доступна.
+        """
+        try:
+            self.build()
+        except DatabaseError:
+            pass
+
+    def get_data(self):
+        version = get_catalog_version()['token']
+        with self._lock:
+            keys, items = self._keys, self._items
+            expired = (
+                version != self._version
+                or time.monotonic() - self._built_at
+                > settings.INGREDIENT_INDEX_TTL
+            )
+        if keys is None or expired:
+            keys, items = self.build()
+        return keys, items
+
+    def search(self, name=None, limit=None):
+        """
+        Возвращает ингредиенты, название которых начинается с name,
+        а после них — ингредиенты, в названии которых name встречается.
+        """
+        keys, items = self.get_data()
+        if not name:
+            return items[:limit]
+        prefix = name.casefold()
+        start = bisect.bisect_left(keys, prefix)
+        end = bisect.bisect_left(keys, prefix + MAX_CHAR, start)
+        result = items[start:end]
+        if limit is not None and len(result) >= limit:
+            return result[:limit]
+        result += [
+            item for key, item in zip(keys, items)
+            if prefix in key and not key.startswith(prefix)
+        ]
+        return result[:limit]
+
+
+ingredient_index = IngredientIndex()
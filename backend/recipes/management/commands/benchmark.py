@@ -0,0 +1,242 @@
+import json
+import time
+import tracemalloc
+
+from django.conf import settings
+from django.core.management import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from recipes.models import Recipe, ShoppingCart
+from users.models import User
+
+PERCENTILES = (50, 95, 99)
+
+
+def get_scenarios(recipe_id, last_page):
+    """
+    Возвращает проверяемые запросы: название и адрес.
+    """
+    return (
+        ('recipes_list', '/api/recipes/'),
+        ('recipes_list_last_page', f'/api/recipes/?page={last_page}'),
+        ('recipes_cursor', '/api/recipes/?cursor=&limit=6'),
+        ('recipes_favorited', '/api/recipes/?is_favorited=1'),
+        ('recipes_in_shopping_cart', '/api/recipes/?is_in_shopping_cart=1'),
+        ('recipes_by_tags', '/api/recipes/?tags=breakfast&tags=lunch'),
+        (
+            'recipes_by_all_tags',
+            '/api/recipes/?tags=breakfast&tags=lunch&tags_mode=all'
+        ),
+        ('recipe_detail', f'/api/recipes/{recipe_id}/'),
+        ('feed', '/api/recipes/feed/'),
+        ('users_list', '/api/users/'),
+        ('users_me', '/api/users/me/'),
+        ('subscriptions', '/api/users/subscriptions/?recipes_limit=3'),
+        ('ingredients_search', '/api/ingredients/?name=ка'),
+        ('ingredients_all', '/api/ingredients/'),
+        ('download_shopping_cart', '/api/recipes/download_shopping_cart/'),
+        (
+            'download_shopping_cart_json',
+            '/api/recipes/download_shopping_cart/?format=json'
+        ),
+    )
+
+
+def percentile(values, percent):
+    """
+    Возвращает процентиль отсортированного списка (nearest-rank).
+    """
+    index = max(0, round(percent / 100 * len(values) + 0.5) - 1)
+    return values[min(index, len(values) - 1)]
+
+
+class Command(BaseCommand):
+    """
+    Команда для замера времени ответа основных эндпоинтов API.
+    """
+    help = (
+        'Вызывает эндпоинты через тестовый клиент Django и выводит '
+        'p50/p95/p99, число запросов к БД и пиковую память.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=50,
+            help='Количество запросов на сценарий.'
+        )
+        parser.add_argument(
+            '--email',
+            help='Пользователь, от имени которого выполняются запросы.'
+        )
+        parser.add_argument(
+            '--only',
+            nargs='+',
+            help='Выполнить только перечисленные сценарии.'
+        )
+        parser.add_argument(
+            '--output',
+            help='Файл, в который сохраняются результаты в JSON.'
+        )
+        parser.add_argument(
+            '--cart-size',
+            type=int,
+            help=(
+                'Дополнить корзину пользователя до указанного числа '
+                'рецептов перед замером.'
+            )
+        )
+        parser.add_argument(
+            '--baseline',
+            help='Файл с прошлыми результатами для сравнения.'
+        )
+
+    def get_user(self, email):
+        if email:
+            return User.objects.get(email=email)
+        user = User.objects.annotate(
+            cart_size=Count('user_shopping_cart')
+        ).order_by('-cart_size').first()
+        if user is None:
+            raise CommandError(
+                'Нет пользователей, сначала выполните generate_data.'
+            )
+        return user
+
+    def fill_cart(self, user, size):
+        missing = size - user.user_shopping_cart.count()
+        if missing <= 0:
+            return
+        recipe_ids = Recipe.objects.exclude(
+            shoppingcart__user=user
+        ).order_by('-favorites_count').values_list('id', flat=True)
+        ShoppingCart.objects.bulk_create(
+            (
+                ShoppingCart(user=user, recipe_id=recipe_id)
+                for recipe_id in recipe_ids[:missing]
+            ),
+            ignore_conflicts=True
+        )
+
+    def get_client(self, user):
+        token, _ = Token.objects.get_or_create(user=user)
+        host = next(
+            (host for host in settings.ALLOWED_HOSTS if host != '*'),
+            'localhost'
+        ).lstrip('.')
+        return Client(
+            HTTP_AUTHORIZATION=f'Token {token.key}',
+            HTTP_HOST=host,
+        )
+
+    def request(self, client, url):
+        response = client.get(url)
+        if response.streaming:
+            b''.join(response.streaming_content)
+        return response
+
+    def measure(self, client, url, count):
+        """
+        Выполняет запрос count раз и возвращает метрики сценария.
+        """
+        response = self.request(client, url)
+        with CaptureQueriesContext(connection) as queries:
+            self.request(client, url)
+        query_count = len(queries)
+        timings = []
+        for _ in range(count):
+            started = time.perf_counter()
+            self.request(client, url)
+            timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+
+        tracemalloc.start()
+        self.request(client, url)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        result = {
+            'status': response.status_code,
+            'queries': query_count,
+            'peak_memory_kb': round(peak / 1024, 1),
+            'mean_ms': round(sum(timings) / len(timings), 2),
+        }
+        for percent in PERCENTILES:
+            result[f'p{percent}_ms'] = round(
+                percentile(timings, percent), 2
+            )
+        return result
+
+    def handle(self, *args, **options):
+        user = self.get_user(options['email'])
+        if options['cart_size']:
+            self.fill_cart(user, options['cart_size'])
+        client = self.get_client(user)
+        recipe = Recipe.objects.order_by('-favorites_count').first()
+        if recipe is None:
+            raise CommandError(
+                'Нет рецептов, сначала выполните generate_data.'
+            )
+
+        page_size = settings.REST_FRAMEWORK['PAGE_SIZE']
+        last_page = -(-Recipe.objects.count() // page_size)
+
+        results = {}
+        for name, url in get_scenarios(recipe.id, last_page):
+            if options['only'] and name not in options['only']:
+                continue
+            results[name] = self.measure(client, url, options['requests'])
+
+        baseline = {}
+        if options['baseline']:
+            with open(options['baseline'], encoding='utf-8') as file:
+                baseline = json.load(file)['scenarios']
+        self.print_results(results, baseline)
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(
+                    {
+                        'created': timezone.now().isoformat(),
+                        'database': connection.vendor,
+                        'requests': options['requests'],
+                        'recipes': Recipe.objects.count(),
+                        'cart_size': user.user_shopping_cart.count(),
+                        'scenarios': results,
+                    },
+                    file,
+                    ensure_ascii=False,
+                    indent=2
+                )
+
+    def print_results(self, results, baseline):
+        header = (
+            f'{"сценарий":<30}{"код":>5}{"p50":>9}{"p95":>9}{"p99":>9}'
+            f'{"запр.":>7}{"память, КБ":>12}'
+        )
+        self.stdout.write(header)
+        for name, result in results.items():
+            line = (
+                f'{name:<30}{result["status"]:>5}'
+                f'{result["p50_ms"]:>9.2f}{result["p95_ms"]:>9.2f}'
+                f'{result["p99_ms"]:>9.2f}{result["queries"]:>7}'
+                f'{result["peak_memory_kb"]:>12.1f}'
+            )
+            previous = baseline.get(name)
+            if previous:
+                change = (
+                    (result['p50_ms'] - previous['p50_ms'])
+                    / previous['p50_ms'] * 100
+                    if previous['p50_ms'] else 0
+                )
+                line += (
+                    f'  p50 {change:+.1f}%, запросов '
+                    f'{previous["queries"]} -> {result["queries"]}'
+                )
+            self.stdout.write(line)
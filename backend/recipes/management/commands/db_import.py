@@ -1,55 +1,144 @@
-import os
-import traceback
 import csv
+import json
+import os
+import time
+from itertools import islice
 
 from django.conf import settings
-from django.core.management import BaseCommand
+from django.core.management import BaseCommand, CommandError
+from django.db import transaction
 
+from recipes.catalog import bump_catalog_version
 from recipes.models import Ingredient
 
+READ_CHUNK_SIZE = 64 * 1024
+
+
+def read_csv(file):
+    """
+    Читает пары (название, единица измерения) из CSV-файла.
+    """
+    for row in csv.reader(file):
+        if not row:
+            continue
+        name, measurement_unit = row
+        yield name, measurement_unit
+
+
+def iter_json_array(file):
+    """
+    Читает элементы JSON-массива по одному, не загружая файл целиком.
+    """
+    decoder = json.JSONDecoder()
+    buffer = file.read(READ_CHUNK_SIZE).lstrip()
+    if not buffer.startswith('['):
+        raise CommandError('Ожидался JSON-массив.')
+    buffer = buffer[1:]
+    eof = False
+    while True:
+        buffer = buffer.lstrip(' \t\r\n,')
+        if buffer.startswith(']'):
+            return
+        try:
+            item, end = decoder.raw_decode(buffer)
+        except json.JSONDecodeError:
+            if eof:
+                raise CommandError('Некорректный JSON-файл.')
+            chunk = file.read(READ_CHUNK_SIZE)
+            eof = not chunk
+            buffer += chunk
+            continue
+        yield item
+        buffer = buffer[end:]
+
+
+def read_json(file):
+    """
+    Читает пары (название, единица измерения) из JSON-файла.
+    """
+    for item in iter_json_array(file):
+        yield item['name'], item['measurement_unit']
+
+
+READERS = {
+    '.csv': read_csv,
+    '.json': read_json,
+}
+
 
 class Command(BaseCommand):
     """
-    Команда для импорта ингредиентов из CSV-файла.
+    Команда для импорта ингредиентов из CSV- или JSON-файла.
+
+    Ингредиенты добавляются пачками, уже существующие пары
+    (название, единица измерения) пропускаются, поэтому повторный
+    импорт не меняет id ингредиентов и не затрагивает рецепты.
     """
-    def load_data_from_csv(self, filename, model_class):
-        """
-        Функция удаляет все объекты модели Ingredient,
-        если база уже заполнена.
-        """
-        if Ingredient.objects.exists():
-            Ingredient.objects.all().delete()
+    help = 'Импортирует ингредиенты из data/ingredients.csv или .json.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'filename',
+            nargs='?',
+            default='ingredients.csv',
+            help='Файл в папке data или путь к файлу (.csv или .json).'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.IMPORT_BATCH_SIZE,
+            help='Количество ингредиентов в одной транзакции.'
+        )
+
+    def get_path(self, filename):
+        if os.path.exists(filename):
+            return filename
+        return os.path.join(settings.BASE_DIR, 'data', filename)
+
+    def load_ingredients(self, rows, batch_size):
         """
-        Функция для импорта данных из CSV-файла.
+        Добавляет ингредиенты пачками по batch_size строк.
+        Возвращает количество прочитанных строк.
         """
-        try:
-            with open(
-                os.path.join(settings.BASE_DIR, 'data', filename),
-                encoding='utf-8'
-            ) as file:
-                reader = csv.reader(file)
-                for row in reader:
-                    name, measurement_unit = row
-                    model_instance = model_class(
-                        name=name,
-                        measurement_unit=measurement_unit
-                    )
-                    model_instance.save()
-        except ValueError:
-            print('Некорректное значение в данных')
-        except Exception:
-            raise
-
-    def handle(self, *args, **options,):
+        total = 0
+        while True:
+            batch = [
+                Ingredient(name=name, measurement_unit=measurement_unit)
+                for name, measurement_unit in islice(rows, batch_size)
+            ]
+            if not batch:
+                return total
+            with transaction.atomic():
+                Ingredient.objects.bulk_create(
+                    batch, ignore_conflicts=True
+                )
+            total += len(batch)
+
+    def handle(self, *args, **options):
         """
-        Выводит сообщение о статусе импорта данных.
+        Импортирует ингредиенты и выводит статистику импорта.
         """
-        try:
-            self.load_data_from_csv(
-                'ingredients.csv',
-                Ingredient
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size должен быть не меньше 1.')
+        path = self.get_path(options['filename'])
+        reader = READERS.get(os.path.splitext(path)[1].lower())
+        if reader is None:
+            raise CommandError('Поддерживаются только файлы .csv и .json.')
+
+        count_before = Ingredient.objects.count()
+        started = time.monotonic()
+        with open(path, encoding='utf-8') as file:
+            total = self.load_ingredients(
+                reader(file), options['batch_size']
             )
-            print('Импорт данных завершен.')
-        except Exception:
-            traceback.print_exc()
-            print('Импорт данных не удался.')
+        elapsed = time.monotonic() - started
+        created = Ingredient.objects.count() - count_before
+        # bulk_create не отправляет сигналы, поэтому кэш справочников
+        # и индекс ингредиентов сбрасываются здесь.
+        bump_catalog_version()
+
+        self.stdout.write(
+            f'Импорт данных завершен: прочитано {total}, '
+            f'добавлено {created}, '
+            f'{total / elapsed if elapsed else total:.0f} строк/с.'
+        )
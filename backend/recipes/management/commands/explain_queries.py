@@ -0,0 +1,185 @@
+import re
+
+from django.conf import settings
+from django.core.management import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from recipes.models import Recipe, Tag, TimelineEntry
+from recipes.pagination import seek
+from recipes.shopping_cart import get_shopping_cart_ingredients
+from recipes.views import RecipeViewSet
+from users.models import User
+from users.views import CustomUserViewSet
+
+# Строки плана с полным чтением таблицы: PostgreSQL пишет
+# "Seq Scan on <таблица>", SQLite - "SCAN <таблица>" без "USING INDEX".
+SEQ_SCAN_PATTERNS = {
+    'postgresql': re.compile(r'Seq Scan on (\w+)'),
+    'sqlite': re.compile(r'\bSCAN (?:TABLE )?(\w+)\b(?! USING)'),
+}
+
+SQLITE_NOT_TABLES = ('CONSTANT', 'SUBQUERY')
+
+
+def get_view_queryset(viewset, action, user, params=None):
+    """
+    Возвращает queryset, который представление строит для GET-запроса
+    с переданными параметрами, со всеми фильтрами.
+    """
+    request = Request(APIRequestFactory().get('/', params or {}))
+    request.user = user
+    view = viewset(
+        action=action,
+        request=request,
+        args=(),
+        kwargs={},
+        format_kwarg=None,
+    )
+    return view.filter_queryset(view.get_queryset())
+
+
+def get_scenarios(user, author, tags):
+    """
+    Возвращает проверяемые запросы: название и queryset.
+    Списки ограничены размером страницы, как при пагинации.
+    """
+    page_size = settings.REST_FRAMEWORK['PAGE_SIZE']
+    recipe_lists = (
+        ('recipes_list', {}),
+        ('recipes_by_author', {'author': author.id}),
+        ('recipes_by_tags', {'tags': tags}),
+        ('recipes_by_all_tags', {'tags': tags, 'tags_mode': 'all'}),
+        ('recipes_favorited', {'is_favorited': 1}),
+        ('recipes_in_shopping_cart', {'is_in_shopping_cart': 1}),
+        (
+            'recipes_combined_filters',
+            {
+                'is_favorited': 1,
+                'is_in_shopping_cart': 1,
+                'tags': tags,
+                'author': author.id,
+            }
+        ),
+        ('recipes_by_popularity', {'ordering': '-favorites_count'}),
+    )
+    scenarios = [
+        (name, get_view_queryset(RecipeViewSet, 'list', user, params)[
+            :page_size
+        ])
+        for name, params in recipe_lists
+    ]
+    scenarios += [
+        (
+            'subscriptions',
+            get_view_queryset(
+                CustomUserViewSet, 'subscriptions', user,
+                {'recipes_limit': 3}
+            )[:page_size]
+        ),
+        (
+            'feed',
+            seek(
+                TimelineEntry.objects.filter(user=user),
+                None,
+                id_field='recipe_id'
+            ).values_list('pub_date', 'recipe_id')[:page_size + 1]
+        ),
+        ('download_shopping_cart', get_shopping_cart_ingredients(user)),
+    ]
+    return scenarios
+
+
+def find_seq_scans(plan, vendor):
+    """
+    Возвращает таблицы, которые читаются из плана целиком.
+    """
+    pattern = SEQ_SCAN_PATTERNS[vendor]
+    return sorted({
+        table for table in pattern.findall(plan)
+        if table not in SQLITE_NOT_TABLES
+    })
+
+
+class Command(BaseCommand):
+    """
+    Команда для проверки планов основных запросов API.
+    """
+    help = (
+        'Выполняет EXPLAIN для querysets основных эндпоинтов и завершается '
+        'с ошибкой, если какой-либо из них читает таблицу целиком. '
+        'Запускать на данных из generate_data.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--email',
+            help='Пользователь, от имени которого строятся запросы.'
+        )
+        parser.add_argument(
+            '--only',
+            nargs='+',
+            help='Проверить только перечисленные запросы.'
+        )
+
+    def get_user(self, email):
+        if email:
+            return User.objects.get(email=email)
+        user = User.objects.annotate(
+            cart_size=Count('user_shopping_cart')
+        ).order_by('-cart_size').first()
+        if user is None:
+            raise CommandError(
+                'Нет пользователей, сначала выполните generate_data.'
+            )
+        return user
+
+    def explain(self, queryset):
+        """
+        Возвращает план запроса. В PostgreSQL последовательное
+        чтение запрещается на время запроса: если оно все равно
+        попадает в план, подходящего индекса нет.
+        """
+        with transaction.atomic():
+            if connection.vendor == 'postgresql':
+                with connection.cursor() as cursor:
+                    cursor.execute('SET LOCAL enable_seqscan = off')
+            return queryset.explain()
+
+    def handle(self, *args, **options):
+        if connection.vendor not in SEQ_SCAN_PATTERNS:
+            raise CommandError(
+                f'EXPLAIN не поддерживается для {connection.vendor}.'
+            )
+        user = self.get_user(options['email'])
+        author = User.objects.annotate(
+            recipes_count=Count('recipes')
+        ).order_by('-recipes_count').first()
+        tags = list(Tag.objects.values_list('slug', flat=True)[:2])
+        if not Recipe.objects.exists():
+            raise CommandError(
+                'Нет рецептов, сначала выполните generate_data.'
+            )
+
+        failed = []
+        for name, queryset in get_scenarios(user, author, tags):
+            if options['only'] and name not in options['only']:
+                continue
+            plan = self.explain(queryset)
+            tables = find_seq_scans(plan, connection.vendor)
+            if tables:
+                failed.append(name)
+                self.stdout.write(self.style.ERROR(
+                    f'{name:<30} SEQ SCAN: {", ".join(tables)}'
+                ))
+            else:
+                self.stdout.write(self.style.SUCCESS(f'{name:<30} OK'))
+            if tables or options['verbosity'] > 1:
+                self.stdout.write(plan)
+
+        if failed:
+            raise CommandError(
+                f'Полное чтение таблиц в запросах: {", ".join(failed)}.'
+            )
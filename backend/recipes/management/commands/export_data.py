@@ -0,0 +1,42 @@
+import sys
+
+from django.conf import settings
+from django.core.management import BaseCommand
+
+from recipes.dump import export_rows
+
+
+class Command(BaseCommand):
+    """
+    Команда для выгрузки рецептов, пользователей и связей в NDJSON.
+    """
+    help = 'Выгружает данные в NDJSON: по одному объекту в строке.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'output',
+            help='Файл для выгрузки или "-" для вывода в stdout.'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=settings.IMPORT_BATCH_SIZE,
+            help='Количество строк, читаемых из БД за один раз.'
+        )
+        parser.add_argument(
+            '--media',
+            help='Папка, в которую копируются изображения рецептов.'
+        )
+
+    def handle(self, *args, **options):
+        if options['output'] == '-':
+            counts = export_rows(
+                sys.stdout, options['chunk_size'], options['media']
+            )
+        else:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                counts = export_rows(
+                    file, options['chunk_size'], options['media']
+                )
+        for label, count in counts.items():
+            self.stderr.write(f'{label}: {count}')
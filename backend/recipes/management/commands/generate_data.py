@@ -0,0 +1,244 @@
+import io
+import random
+import time
+from datetime import timedelta
+from itertools import accumulate
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import BaseCommand, call_command
+from django.db import transaction
+from django.utils import timezone
+from PIL import Image
+
+from recipes.dump import keep_auto_dates
+from recipes.models import (FavoriteRecipe, Ingredient, Recipe,
+                            RecipeIngredient, ShoppingCart, Tag)
+from recipes.search import update_search_vector
+from users.models import SubscribeUser, User
+
+IMAGE_NAME = 'recipesphoto/generated.jpg'
+TAGS = (
+    ('Завтрак', '#E26C2D', 'breakfast'),
+    ('Обед', '#49B64E', 'lunch'),
+    ('Ужин', '#8775D2', 'dinner'),
+)
+
+
+class ZipfSampler:
+    """
+    Выбирает элементы с вероятностью, убывающей как 1 / rank ** s:
+    первые элементы списка выбираются чаще остальных.
+    """
+    def __init__(self, population, exponent):
+        self.population = list(population)
+        self.cum_weights = list(accumulate(
+            1 / rank ** exponent
+            for rank in range(1, len(self.population) + 1)
+        ))
+
+    def choice(self):
+        return self.choices(1)[0]
+
+    def choices(self, k):
+        return random.choices(
+            self.population, cum_weights=self.cum_weights, k=k
+        )
+
+    def sample(self, k):
+        """
+        Возвращает до k различных элементов.
+        """
+        k = min(k, len(self.population))
+        result = set()
+        for _ in range(k * 10):
+            result.update(self.choices(k - len(result)))
+            if len(result) >= k:
+                break
+        return list(result)
+
+
+class Command(BaseCommand):
+    """
+    Команда для генерации тестовых данных заданного объема.
+    """
+    help = (
+        'Создает пользователей, рецепты, избранное, корзины и подписки '
+        'с неравномерной (Zipf) популярностью.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--recipes', type=int, default=1000)
+        parser.add_argument('--ingredients-per-recipe', type=int, default=8)
+        parser.add_argument('--tags-per-recipe', type=int, default=2)
+        parser.add_argument('--favorites-per-user', type=int, default=20)
+        parser.add_argument('--cart-per-user', type=int, default=5)
+        parser.add_argument('--subscriptions-per-user', type=int, default=10)
+        parser.add_argument(
+            '--zipf',
+            type=float,
+            default=1.1,
+            help='Показатель распределения популярности.'
+        )
+        parser.add_argument('--seed', type=int, default=None)
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.IMPORT_BATCH_SIZE
+        )
+
+    def handle(self, *args, **options):
+        random.seed(options['seed'])
+        self.batch_size = options['batch_size']
+        self.zipf = options['zipf']
+        started = time.monotonic()
+
+        if not Ingredient.objects.exists():
+            call_command('db_import', stdout=io.StringIO())
+        tags = self.get_tags()
+        users = self.create_users(options['users'])
+        recipes = self.create_recipes(
+            options['recipes'],
+            users,
+            tags,
+            options['ingredients_per_recipe'],
+            options['tags_per_recipe'],
+        )
+        recipe_sampler = ZipfSampler(recipes, self.zipf)
+        self.create_relations(
+            FavoriteRecipe, users, recipe_sampler,
+            options['favorites_per_user']
+        )
+        self.create_relations(
+            ShoppingCart, users, recipe_sampler, options['cart_per_user']
+        )
+        self.create_subscriptions(
+            users, options['subscriptions_per_user']
+        )
+        call_command('recount_favorites', stdout=io.StringIO())
+        call_command('rebuild_timelines', stdout=io.StringIO())
+        call_command('update_similar_recipes', stdout=io.StringIO())
+        update_search_vector(Recipe.objects.filter(id__in=recipes))
+
+        self.stdout.write(
+            f'Создано пользователей: {len(users)}, '
+            f'рецептов: {len(recipes)} '
+            f'за {time.monotonic() - started:.1f} с.'
+        )
+
+    def bulk_create(self, model, objects):
+        with keep_auto_dates(model), transaction.atomic():
+            return model.objects.bulk_create(
+                objects, batch_size=self.batch_size, ignore_conflicts=True
+            )
+
+    def get_tags(self):
+        if not Tag.objects.exists():
+            Tag.objects.bulk_create(
+                Tag(name=name, color=color, slug=slug)
+                for name, color, slug in TAGS
+            )
+        return list(Tag.objects.values_list('id', flat=True))
+
+    def get_image(self):
+        if not default_storage.exists(IMAGE_NAME):
+            buffer = io.BytesIO()
+            Image.new('RGB', (1200, 800), '#E26C2D').save(buffer, 'JPEG')
+            default_storage.save(IMAGE_NAME, ContentFile(buffer.getvalue()))
+        return IMAGE_NAME
+
+    def create_users(self, count):
+        password = make_password('generated-password')
+        start = User.objects.count()
+        users = []
+        for number in range(start, start + count):
+            users.append(User(
+                email=f'generated{number}@example.com',
+                username=f'generated{number}',
+                first_name='Пользователь',
+                last_name=str(number),
+                password=password,
+            ))
+        self.bulk_create(User, users)
+        return list(User.objects.filter(
+            username__in=[user.username for user in users]
+        ).values_list('id', flat=True))
+
+    def create_recipes(self, count, users, tags, ingredients_count,
+                       tags_count):
+        author_sampler = ZipfSampler(users, self.zipf)
+        ingredient_sampler = ZipfSampler(
+            Ingredient.objects.values_list('id', flat=True), self.zipf
+        )
+        tag_sampler = ZipfSampler(tags, self.zipf)
+        image = self.get_image()
+        now = timezone.now()
+        created = []
+        for offset in range(0, count, self.batch_size):
+            size = min(self.batch_size, count - offset)
+            batch = [
+                Recipe(
+                    author_id=author_sampler.choice(),
+                    name=f'Рецепт {offset + number} {random.random():.8f}',
+                    text='Смешать ингредиенты и готовить до готовности.',
+                    cooking_time=random.randint(
+                        settings.COOKING_TIME_MIN, settings.COOKING_TIME_MAX
+                    ),
+                    image=image,
+                    pub_date=now - timedelta(
+                        seconds=random.randint(0, 365 * 24 * 60 * 60)
+                    ),
+                )
+                for number in range(size)
+            ]
+            self.bulk_create(Recipe, batch)
+            recipe_ids = list(Recipe.objects.filter(
+                name__in=[recipe.name for recipe in batch]
+            ).values_list('id', flat=True))
+            self.bulk_create(RecipeIngredient, [
+                RecipeIngredient(
+                    recipe_id=recipe_id,
+                    ingredient_id=ingredient_id,
+                    amount=random.randint(1, 500),
+                )
+                for recipe_id in recipe_ids
+                for ingredient_id in ingredient_sampler.sample(
+                    ingredients_count
+                )
+            ])
+            self.bulk_create(Recipe.tags.through, [
+                Recipe.tags.through(recipe_id=recipe_id, tag_id=tag_id)
+                for recipe_id in recipe_ids
+                for tag_id in tag_sampler.sample(tags_count)
+            ])
+            created.extend(recipe_ids)
+        return created
+
+    def create_relations(self, model, users, recipe_sampler, per_user):
+        objects = []
+        for user_id in users:
+            objects.extend(
+                model(user_id=user_id, recipe_id=recipe_id)
+                for recipe_id in recipe_sampler.sample(per_user)
+            )
+            if len(objects) >= self.batch_size:
+                self.bulk_create(model, objects)
+                objects = []
+        self.bulk_create(model, objects)
+
+    def create_subscriptions(self, users, per_user):
+        author_sampler = ZipfSampler(users, self.zipf)
+        objects = []
+        for user_id in users:
+            objects.extend(
+                SubscribeUser(subscriber_id=user_id, target_user_id=author)
+                for author in author_sampler.sample(per_user)
+                if author != user_id
+            )
+            if len(objects) >= self.batch_size:
+                self.bulk_create(SubscribeUser, objects)
+                objects = []
+        self.bulk_create(SubscribeUser, objects)
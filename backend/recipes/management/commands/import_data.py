@@ -0,0 +1,48 @@
+import sys
+
+from django.conf import settings
+from django.core.management import BaseCommand
+
+from recipes.dump import import_rows
+
+
+class Command(BaseCommand):
+    """
+    Команда для загрузки данных, выгруженных командой export_data.
+    """
+    help = 'Загружает данные из NDJSON пачками через bulk_create.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'input',
+            help='Файл с выгрузкой или "-" для чтения из stdin.'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.IMPORT_BATCH_SIZE,
+            help='Количество объектов в одной транзакции.'
+        )
+        parser.add_argument(
+            '--ignore-conflicts',
+            action='store_true',
+            help='Пропускать объекты, которые уже есть в БД.'
+        )
+        parser.add_argument(
+            '--media',
+            help='Папка, из которой копируются изображения рецептов.'
+        )
+
+    def handle(self, *args, **options):
+        arguments = (
+            options['batch_size'],
+            options['ignore_conflicts'],
+            options['media'],
+        )
+        if options['input'] == '-':
+            counts = import_rows(sys.stdin, *arguments)
+        else:
+            with open(options['input'], encoding='utf-8') as file:
+                counts = import_rows(file, *arguments)
+        for label, count in counts.items():
+            self.stdout.write(f'{label}: {count}')
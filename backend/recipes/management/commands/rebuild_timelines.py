@@ -0,0 +1,28 @@
+from itertools import groupby
+
+from django.core.management import BaseCommand
+
+from recipes.feed import fill_timeline
+from recipes.models import TimelineEntry
+from users.models import SubscribeUser
+
+
+class Command(BaseCommand):
+    """
+    Команда для заполнения лент подписок по текущим подпискам.
+    """
+    help = (
+        'Очищает таблицу лент и заполняет ее последними рецептами '
+        'авторов, на которых подписан каждый пользователь.'
+    )
+
+    def handle(self, *args, **options):
+        TimelineEntry.objects.all().delete()
+        subscriptions = SubscribeUser.objects.order_by(
+            'subscriber_id'
+        ).values_list('subscriber_id', 'target_user_id').iterator()
+        users = 0
+        for user_id, rows in groupby(subscriptions, key=lambda row: row[0]):
+            fill_timeline(user_id, [author_id for _, author_id in rows])
+            users += 1
+        self.stdout.write(f'Заполнено лент: {users}.')
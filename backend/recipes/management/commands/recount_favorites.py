@@ -0,0 +1,29 @@
+from django.core.management import BaseCommand
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from recipes.models import FavoriteRecipe, Recipe
+
+
+class Command(BaseCommand):
+    """
+    Команда для пересчета счетчика добавлений рецептов в избранное.
+    """
+    help = 'Пересчитывает Recipe.favorites_count по таблице избранного.'
+
+    def handle(self, *args, **options):
+        """
+        Обновляет счетчики всех рецептов одним запросом.
+        """
+        favorites_count = FavoriteRecipe.objects.filter(
+            recipe=OuterRef('pk')
+        ).order_by().values('recipe').annotate(
+            count=Count('id')
+        ).values('count')
+        updated = Recipe.objects.update(
+            favorites_count=Coalesce(
+                Subquery(favorites_count, output_field=IntegerField()),
+                0
+            )
+        )
+        self.stdout.write(f'Обновлено рецептов: {updated}.')
@@ -0,0 +1,15 @@
+from django.core.management import BaseCommand
+
+from recipes.models import Recipe
+from recipes.search import update_search_vector
+
+
+class Command(BaseCommand):
+    """
+    Команда для пересчета поисковых векторов рецептов.
+    """
+    help = 'Пересчитывает Recipe.search_vector для всех рецептов.'
+
+    def handle(self, *args, **options):
+        updated = update_search_vector(Recipe.objects.all())
+        self.stdout.write(f'Обновлено рецептов: {updated}.')
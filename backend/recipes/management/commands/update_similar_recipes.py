@@ -0,0 +1,46 @@
+import time
+
+from django.conf import settings
+from django.core.management import BaseCommand
+
+from recipes.similarity import update_similar
+
+
+class Command(BaseCommand):
+    """
+    Команда для пересчета похожих рецептов.
+    """
+    help = (
+        'Считает косинусное сходство рецептов по ингредиентам и тегам '
+        'и сохраняет top-K похожих в таблицу recipes_similarrecipe.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--recipes',
+            nargs='+',
+            type=int,
+            help='Пересчитать только перечисленные рецепты.'
+        )
+        parser.add_argument(
+            '--top-k',
+            type=int,
+            default=settings.SIMILAR_RECIPES_COUNT,
+            help='Количество похожих рецептов.'
+        )
+        parser.add_argument(
+            '--block-size',
+            type=int,
+            default=settings.SIMILAR_BLOCK_SIZE,
+            help='Количество строк матрицы, обрабатываемых за раз.'
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        saved = update_similar(
+            options['recipes'], options['top_k'], options['block_size']
+        )
+        self.stdout.write(
+            f'Сохранено пар: {saved} '
+            f'за {time.monotonic() - started:.1f} с.'
+        )
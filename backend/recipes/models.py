@@ -1,8 +1,11 @@
 from django.db import models
+from django.db.models import Exists, OuterRef, Prefetch
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.conf import settings
 from colorfield.fields import ColorField
 
+from recipes.search import SearchVectorIndex
 from users.models import User
 
 
@@ -27,6 +30,14 @@ class Ingredient(models.Model):
         verbose_name='Единица измерения',
     )
 
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(
+                fields=('name', 'measurement_unit'),
+                name='unique_ingredient'
+            ),
+        )
+
     def __str__(self):
         return self.name
 
@@ -59,6 +70,61 @@ class Tag(models.Model):
         return self.name
 
 
+class RecipeQuerySet(models.QuerySet):
+    """
+    QuerySet рецептов.
+    """
+    def with_user_flags(self, user):
+        """
+        Добавляет к рецептам флаги is_favorited и is_in_shopping_cart
+        для переданного пользователя.
+        """
+        if user.is_anonymous:
+            return self
+        return self.annotate(
+            is_favorited=Exists(
+                FavoriteRecipe.objects.filter(
+                    user=user,
+                    recipe=OuterRef('pk')
+                )
+            ),
+            is_in_shopping_cart=Exists(
+                ShoppingCart.objects.filter(
+                    user=user,
+                    recipe=OuterRef('pk')
+                )
+            ),
+        )
+
+    def with_related(self, user):
+        """
+        Подгружает теги, ингредиенты и авторов рецептов
+        фиксированным числом запросов.
+        """
+        return self.prefetch_related(
+            'tags',
+            Prefetch(
+                'recipeingredient_set',
+                queryset=RecipeIngredient.objects.select_related(
+                    'ingredient'
+                )
+            ),
+            Prefetch(
+                'author',
+                queryset=User.objects.with_is_subscribed(user)
+            ),
+        )
+
+
+class RecipeManager(models.Manager.from_queryset(RecipeQuerySet)):
+    """
+    Менеджер рецептов. Поисковый вектор нужен только в запросах
+    поиска, поэтому по умолчанию не загружается.
+    """
+    def get_queryset(self):
+        return super().get_queryset().defer('search_vector')
+
+
 class Recipe(models.Model):
     """
     Модель рецепта.
@@ -72,6 +138,11 @@ class Recipe(models.Model):
     - text: Рецепт приготовления (TextField)
     - cooking_time: Время приготовления блюда (PositiveSmallIntegerField)
     - pub_date: Дата публикации (DateTimeField)
+    - favorites_count: Количество добавлений в избранное
+      (PositiveIntegerField)
+    - search_vector: Поисковый вектор по названию и тексту
+      (SearchVectorField)
+    - image_variants: Пути уменьшенных копий изображения (JSONField)
     """
     author = models.ForeignKey(
         User,
@@ -121,13 +192,40 @@ class Recipe(models.Model):
         auto_now_add=True,
         verbose_name='Дата публикации',
     )
+    favorites_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Количество добавлений в избранное',
+    )
+    search_vector = SearchVectorField(
+        null=True,
+        editable=False,
+    )
+    image_variants = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        verbose_name='Варианты изображения',
+    )
+
+    objects = RecipeManager()
+
+    def save_editable(self):
+        """
+        Сохраняет только редактируемые поля рецепта. Счетчик избранного
+        и варианты изображения меняются отдельными запросами update()
+        и не перезаписываются значениями, прочитанными раньше.
+        """
+        self.save(update_fields=[
+            field.name for field in self._meta.concrete_fields
+            if field.editable and not field.primary_key
+        ])
 
     def get_favorite_count(self):
         """
         Получение количества добавлений в избранные рецепты.
         """
-        favorite_count = self.favorite_recipes.count()
-        return favorite_count
+        return self.favorites_count
 
     get_favorite_count.short_description = (
         'Количество добавлений в избранные рецепты.'
@@ -140,6 +238,24 @@ class Recipe(models.Model):
                 name='unique_author_recipe'
             ),
         )
+        indexes = (
+            models.Index(
+                fields=('-pub_date', '-id'),
+                name='recipe_pub_date_id_idx'
+            ),
+            models.Index(
+                fields=('author', '-pub_date', '-id'),
+                name='recipe_author_pub_date_idx'
+            ),
+            models.Index(
+                fields=('-favorites_count', '-pub_date', '-id'),
+                name='recipe_favorites_pub_date_idx'
+            ),
+            SearchVectorIndex(
+                fields=('search_vector',),
+                name='recipe_search_vector_idx'
+            ),
+        )
 
     def __str__(self):
         return self.name
@@ -183,6 +299,12 @@ class RecipeIngredient(models.Model):
                 name='unique_ingredient_amount'
             ),
         )
+        indexes = (
+            models.Index(
+                fields=('recipe', 'ingredient', 'amount'),
+                name='recipe_ingredient_amount_idx'
+            ),
+        )
 
     def __str__(self):
         return (
@@ -290,3 +412,94 @@ class ShoppingCart(models.Model):
             f'рецепт {self.recipe} в списке покупок у '
             f'пользователя {self.user}'
         )
+
+
+class TimelineEntry(models.Model):
+    """
+    Модель записи ленты подписок.
+
+    Новый рецепт копируется в ленты подписчиков автора фоновой
+    задачей, поэтому лента читается по одному индексу без
+    соединения с подписками.
+
+    Поля:
+    - user: Владелец ленты (ForeignKey)
+    - recipe: Рецепт (ForeignKey)
+    - pub_date: Дата публикации рецепта (DateTimeField)
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        verbose_name='Пользователь',
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        verbose_name='Рецепт',
+    )
+    pub_date = models.DateTimeField(
+        verbose_name='Дата публикации',
+    )
+
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'recipe'),
+                name='unique_user_recipe_timeline'
+            ),
+        )
+        indexes = (
+            models.Index(
+                fields=('user', '-pub_date', '-recipe'),
+                name='timeline_user_pub_date_idx'
+            ),
+        )
+
+    def __str__(self):
+        return f'Рецепт {self.recipe} в ленте пользователя {self.user}'
+
+
+class SimilarRecipe(models.Model):
+    """
+    Модель похожего рецепта. Заполняется командой
+    update_similar_recipes по сходству ингредиентов и тегов.
+
+    Поля:
+    - recipe: Рецепт (ForeignKey)
+    - similar: Похожий рецепт (ForeignKey)
+    - score: Косинусная мера сходства (FloatField)
+    """
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='similar_recipes',
+        verbose_name='Рецепт',
+    )
+    similar = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='similar_to',
+        verbose_name='Похожий рецепт',
+    )
+    score = models.FloatField(
+        verbose_name='Сходство',
+    )
+
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(
+                fields=('recipe', 'similar'),
+                name='unique_similar_recipe'
+            ),
+        )
+        indexes = (
+            models.Index(
+                fields=('recipe', '-score'),
+                name='similar_recipe_score_idx'
+            ),
+        )
+
+    def __str__(self):
+        return f'Рецепт {self.similar} похож на {self.recipe}'
@@ -0,0 +1,190 @@
+import base64
+import binascii
+import json
+from collections import OrderedDict
+from datetime import datetime
+from functools import partial
+
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db.models import Q
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+def seek(queryset, position, date_field='pub_date', id_field='id'):
+    """
+    Возвращает объекты после позиции курсора (pub_date, id, reverse)
+    в порядке обхода: по убыванию ключа или, для обратного
+    курсора, по возрастанию.
+    """
+    if position is None:
+        return queryset.order_by(f'-{date_field}', f'-{id_field}')
+    pub_date, pk, reverse = position
+    if reverse:
+        return queryset.filter(
+            Q(**{f'{date_field}__gt': pub_date})
+            | Q(**{date_field: pub_date, f'{id_field}__gt': pk}),
+            **{f'{date_field}__gte': pub_date},
+        ).order_by(date_field, id_field)
+    return queryset.filter(
+        Q(**{f'{date_field}__lt': pub_date})
+        | Q(**{date_field: pub_date, f'{id_field}__lt': pk}),
+        **{f'{date_field}__lte': pub_date},
+    ).order_by(f'-{date_field}', f'-{id_field}')
+
+
+class CountedPaginator(Paginator):
+    """
+    Paginator с заранее посчитанным количеством объектов.
+    """
+    def __init__(self, object_list, per_page, count, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.count = count
+
+
+class LimitPageNumberPagination(PageNumberPagination):
+    """
+    Постраничная пагинация с размером страницы из ?limit=.
+    """
+    page_size_query_param = 'limit'
+    max_page_size = settings.PAGE_SIZE_MAX
+
+
+class RecipePagination(LimitPageNumberPagination):
+    """
+    Пагинация рецептов.
+
+    По умолчанию работает постранично (?page=&limit=). Если передан
+    параметр ?cursor=, рецепты отдаются по ключу (pub_date, id)
+    без COUNT(*) и OFFSET. Количество найденных поиском в памяти
+    рецептов берется из request.search_count.
+    """
+    cursor_query_param = 'cursor'
+    cursor_ordering = ('-pub_date', '-id')
+    invalid_cursor_message = 'Неверный курсор.'
+    invalid_ordering_message = (
+        'Курсорная пагинация доступна только при сортировке '
+        'по дате публикации.'
+    )
+    invalid_search_message = (
+        'Курсорная пагинация недоступна при поиске, используйте ?page=.'
+    )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.use_cursor = self.cursor_query_param in request.query_params
+        if not self.use_cursor:
+            count = getattr(request, 'search_count', None)
+            if count is not None:
+                self.django_paginator_class = partial(
+                    CountedPaginator, count=count
+                )
+            return super().paginate_queryset(queryset, request, view)
+        return self.paginate_by_cursor(queryset, request)
+
+    def paginate_by_cursor(self, queryset, request):
+        """
+        Возвращает страницу рецептов после (или перед) позицией курсора.
+        """
+        self.request = request
+        if self.normalize_ordering(queryset.query.order_by) not in (
+            (), self.cursor_ordering
+        ):
+            raise ValidationError(
+                {'ordering': self.invalid_ordering_message}
+            )
+        page_size = self.get_page_size(request)
+        position = self.decode_cursor(request)
+        results = list(seek(queryset, position)[:page_size + 1])
+        return self.get_cursor_page(results, position, page_size)
+
+    def normalize_ordering(self, ordering):
+        """
+        Убирает повторы полей из сортировки и дополняет ее по id:
+        ?ordering=-pub_date сортирует по ('-pub_date', '-pub_date', '-id'),
+        что совпадает с ('-pub_date', '-id').
+        """
+        if not ordering:
+            return ()
+        normalized = []
+        seen = set()
+        for field in ordering:
+            name = field.lstrip('-') if isinstance(field, str) else field
+            if name in seen:
+                continue
+            seen.add(name)
+            normalized.append(field)
+        if 'id' not in seen and 'pk' not in seen:
+            normalized.append('-id')
+        return tuple(normalized)
+
+    def get_cursor_page(self, results, position, page_size):
+        """
+        Обрезает выборку до page_size объектов в порядке убывания
+        даты и запоминает позиции соседних страниц.
+        """
+        reverse = position is not None and position[2]
+        has_more = len(results) > page_size
+        results = results[:page_size]
+        if reverse:
+            results.reverse()
+
+        self.next_position = self.previous_position = None
+        if results:
+            first, last = results[0], results[-1]
+            if reverse or has_more:
+                self.next_position = (last.pub_date, last.pk, False)
+            if position is not None and (has_more or not reverse):
+                self.previous_position = (first.pub_date, first.pk, True)
+        return results
+
+    def decode_cursor(self, request):
+        """
+        Разбирает курсор из запроса. Пустой курсор означает первую
+        страницу.
+        """
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            data = json.loads(
+                base64.urlsafe_b64decode(encoded.encode('ascii'))
+            )
+            return (
+                datetime.fromisoformat(data['d']),
+                int(data['i']),
+                bool(data.get('r', False)),
+            )
+        except (TypeError, ValueError, KeyError, binascii.Error):
+            raise ValidationError(
+                {self.cursor_query_param: self.invalid_cursor_message}
+            )
+
+    def encode_cursor(self, position):
+        """
+        Возвращает ссылку на страницу с переданной позицией курсора.
+        """
+        if position is None:
+            return None
+        pub_date, pk, reverse = position
+        data = {'d': pub_date.isoformat(), 'i': pk}
+        if reverse:
+            data['r'] = True
+        encoded = base64.urlsafe_b64encode(
+            json.dumps(data).encode('ascii')
+        ).decode('ascii')
+        url = remove_query_param(
+            self.request.build_absolute_uri(), self.page_query_param
+        )
+        return replace_query_param(url, self.cursor_query_param, encoded)
+
+    def get_paginated_response(self, data):
+        if not self.use_cursor:
+            return super().get_paginated_response(data)
+        return Response(OrderedDict((
+            ('next', self.encode_cursor(self.next_position)),
+            ('previous', self.encode_cursor(self.previous_position)),
+            ('results', data),
+        )))
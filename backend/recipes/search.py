@@ -0,0 +1,109 @@
+import heapq
+
+from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                            SearchVector)
+from django.db import connection
+from django.db.models import Case, F, Index, IntegerField, When
+
+NAME_WEIGHT = 'A'
+TEXT_WEIGHT = 'B'
+FALLBACK_WEIGHTS = {NAME_WEIGHT: 1.0, TEXT_WEIGHT: 0.4}
+
+
+class SearchVectorIndex(GinIndex):
+    """
+    GIN-индекс для поискового вектора.
+
+    На других СУБД создается обычный индекс, чтобы схема
+    разворачивалась, например, на SQLite в тестах.
+    """
+    def create_sql(self, model, schema_editor, using='', **kwargs):
+        if schema_editor.connection.vendor != 'postgresql':
+            return Index.create_sql(
+                self, model, schema_editor, using=using, **kwargs
+            )
+        return super().create_sql(model, schema_editor, using, **kwargs)
+
+
+def get_search_vector():
+    return (
+        SearchVector(
+            'name', weight=NAME_WEIGHT, config=settings.SEARCH_CONFIG
+        )
+        + SearchVector(
+            'text', weight=TEXT_WEIGHT, config=settings.SEARCH_CONFIG
+        )
+    )
+
+
+def uses_full_text_search():
+    return connection.vendor == 'postgresql'
+
+
+def update_search_vector(queryset):
+    """
+    Пересчитывает сохраненный поисковый вектор рецептов.
+    """
+    if uses_full_text_search():
+        return queryset.update(search_vector=get_search_vector())
+    return 0
+
+
+def search_recipes(queryset, value, limit=None):
+    """
+    Возвращает рецепты, подходящие под поисковый запрос,
+    отсортированные по релевантности, и их количество, если оно
+    известно заранее (при поиске в памяти), иначе None.
+    limit - сколько рецептов нужно для запрошенной страницы,
+    учитывается при поиске в памяти.
+    """
+    if uses_full_text_search():
+        query = SearchQuery(
+            value, config=settings.SEARCH_CONFIG, search_type='websearch'
+        )
+        return queryset.filter(
+            search_vector=query
+        ).annotate(
+            rank=SearchRank(F('search_vector'), query)
+        ).order_by('-rank', '-pub_date', '-id'), None
+    return search_recipes_in_memory(queryset, value, limit)
+
+
+def search_recipes_in_memory(queryset, value, limit=None):
+    """
+    Поиск без PostgreSQL: рецепты ранжируются в памяти процесса
+    по вхождению слов запроса в название и текст.
+
+    В запрос попадают только limit лучших рецептов, поэтому
+    вместе с queryset возвращается число всех найденных рецептов:
+    его использует пагинация.
+    """
+    words = value.casefold().split()
+    scores = []
+    for pk, name, text, pub_date in queryset.values_list(
+        'id', 'name', 'text', 'pub_date'
+    ).iterator():
+        name, text = name.casefold(), text.casefold()
+        score = sum(
+            FALLBACK_WEIGHTS[NAME_WEIGHT] * (word in name)
+            + FALLBACK_WEIGHTS[TEXT_WEIGHT] * (word in text)
+            for word in words
+        )
+        if score:
+            scores.append((-score, -pub_date.timestamp(), -pk))
+    count = len(scores)
+    if limit is None:
+        scores.sort()
+    else:
+        scores = heapq.nsmallest(limit, scores)
+    ids = [-pk for _, _, pk in scores]
+    if not ids:
+        return queryset.none(), count
+    return queryset.filter(id__in=ids).annotate(
+        rank=Case(
+            *(When(id=pk, then=position) for position, pk in enumerate(ids)),
+            output_field=IntegerField()
+        )
+    ).order_by('rank'), count
@@ -4,10 +4,13 @@ from django.db import transaction
 from rest_framework import serializers
 from drf_extra_fields.fields import Base64ImageField
 
+from recipes.fields import ImageVariantsField
 from recipes.models import (Ingredient, Recipe, RecipeIngredient,
                             FavoriteRecipe, ShoppingCart,
-                            Tag, TagRecipe)
-from users.serializers import CustomUserSerializer
+                            Tag)
+from recipes.tasks import update_similar_recipes
+from users.serializers import (CustomUserSerializer,
+                               SubscribeFavoriteRecipeSerializer)
 
 
 class IngredientSerializer(serializers.ModelSerializer):
@@ -109,6 +112,7 @@ class RecipeSerializer(serializers.ModelSerializer):
     author = CustomUserSerializer(read_only=True)
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
+    image_variants = ImageVariantsField()
 
     class Meta:
         model = Recipe
@@ -121,6 +125,7 @@ class RecipeSerializer(serializers.ModelSerializer):
             'is_in_shopping_cart',
             'name',
             'image',
+            'image_variants',
             'text',
             'cooking_time',
         )
@@ -130,6 +135,8 @@ class RecipeSerializer(serializers.ModelSerializer):
         Возвращает True, если рецепт добавлен в избранное
         у текущего пользователя.
         """
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
         user = self.context['request'].user
         if user.is_anonymous:
             return False
@@ -142,6 +149,8 @@ class RecipeSerializer(serializers.ModelSerializer):
         Возвращает True, если рецепт добавлен в корзину
         у текущего пользователя.
         """
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
         user = self.context['request'].user
         if user.is_anonymous:
             return False
@@ -178,30 +187,78 @@ class CreateRecipeSerializer(serializers.ModelSerializer):
             )
         return value
 
-    def recipe_create_or_update(self, ingredients, tags, recipe):
+    def save_ingredients(self, recipe, ingredients, created=False):
         """
-        Создает или обновляет рецепт.
+        Сохраняет ингредиенты рецепта: удаляет убранные, меняет
+        количество у оставшихся и добавляет новые. Запросы выполняются
+        только для изменившихся строк.
+        Возвращает True, если изменился набор ингредиентов.
         """
-        ingredient_objects = []
-        for ingredient in ingredients:
-            ingredient_object = RecipeIngredient(
+        submitted = {
+            ingredient['id']: ingredient['amount']
+            for ingredient in ingredients
+        }
+        stored = {} if created else {
+            row.ingredient_id: row
+            for row in RecipeIngredient.objects.filter(
+                recipe=recipe
+            ).only('id', 'ingredient_id', 'amount')
+        }
+
+        removed = [
+            row.id for ingredient_id, row in stored.items()
+            if ingredient_id not in submitted
+        ]
+        if removed:
+            RecipeIngredient.objects.filter(id__in=removed).delete()
+
+        changed = []
+        for ingredient_id, row in stored.items():
+            amount = submitted.get(ingredient_id)
+            if amount is not None and amount != row.amount:
+                row.amount = amount
+                changed.append(row)
+        if changed:
+            RecipeIngredient.objects.bulk_update(changed, ('amount',))
+
+        added = [
+            RecipeIngredient(
                 recipe=recipe,
-                ingredient_id=ingredient['id'],
-                amount=ingredient['amount']
+                ingredient_id=ingredient_id,
+                amount=amount
             )
-            ingredient_objects.append(ingredient_object)
-        RecipeIngredient.objects.bulk_create(ingredient_objects)
+            for ingredient_id, amount in submitted.items()
+            if ingredient_id not in stored
+        ]
+        if added:
+            RecipeIngredient.objects.bulk_create(added)
+        return bool(removed or added)
 
-        tag_objects = []
-        for tag in tags:
-            tag_object = TagRecipe(
-                recipe=recipe,
-                tag=tag
+    def save_tags(self, recipe, tags, created=False):
+        """
+        Сохраняет теги рецепта, удаляя и добавляя только
+        изменившиеся связи. Возвращает True, если набор тегов изменился.
+        """
+        through = Recipe.tags.through
+        submitted = {tag.id for tag in tags}
+        stored = set() if created else set(
+            through.objects.filter(recipe=recipe).values_list(
+                'tag_id', flat=True
             )
-            tag_objects.append(tag_object)
-        TagRecipe.objects.bulk_create(tag_objects)
+        )
 
-        recipe.tags.set(tags)
+        removed = stored - submitted
+        if removed:
+            through.objects.filter(
+                recipe=recipe, tag_id__in=removed
+            ).delete()
+
+        added = submitted - stored
+        if added:
+            through.objects.bulk_create(
+                through(recipe=recipe, tag_id=tag_id) for tag_id in added
+            )
+        return bool(removed or added)
 
     class Meta:
         model = Recipe
@@ -216,6 +273,24 @@ class CreateRecipeSerializer(serializers.ModelSerializer):
             'cooking_time',
         )
 
+    def validate_ingredients(self, value):
+        """
+        Проверяет, что все ингредиенты существуют,
+        одним запросом к БД.
+        """
+        ingredients_ids = {ingredient['id'] for ingredient in value}
+        missing = ingredients_ids - set(
+            Ingredient.objects.filter(
+                id__in=ingredients_ids
+            ).values_list('id', flat=True)
+        )
+        if missing:
+            raise serializers.ValidationError(
+                'Ингредиенты не найдены: '
+                f'{", ".join(map(str, sorted(missing)))}.'
+            )
+        return value
+
     def validate(self, data):
         """
         Проверяет валидность данных при создании
@@ -257,25 +332,14 @@ class CreateRecipeSerializer(serializers.ModelSerializer):
         """
         ingredients = validated_data.pop('ingredients')
         tags = validated_data.pop('tags')
-
-        RecipeIngredient.objects.filter(recipe=instance).delete()
-        TagRecipe.objects.filter(recipe=instance).delete()
-
-        for ingredient in ingredients:
-            RecipeIngredient.objects.update_or_create(
-                recipe=instance,
-                ingredient_id=ingredient['id'],
-                defaults={'amount': ingredient['amount']}
-            )
-
-        for tag in tags:
-            TagRecipe.objects.update_or_create(
-                recipe=instance,
-                tag=tag
-            )
-
-        instance.tags.set(tags)
-        return super().update(instance, validated_data)
+        ingredients_changed = self.save_ingredients(instance, ingredients)
+        tags_changed = self.save_tags(instance, tags)
+        if ingredients_changed or tags_changed:
+            update_similar_recipes.enqueue(instance.pk)
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        instance.save_editable()
+        return instance
 
     @transaction.atomic
     def create(self, validated_data):
@@ -289,12 +353,9 @@ class CreateRecipeSerializer(serializers.ModelSerializer):
             author=author,
             **validated_data
         )
-
-        self.recipe_create_or_update(
-            ingredients,
-            tags,
-            recipe
-        )
+        self.save_ingredients(recipe, ingredients, created=True)
+        self.save_tags(recipe, tags, created=True)
+        update_similar_recipes.enqueue(recipe.pk)
         return recipe
 
     def to_representation(self, instance):
@@ -334,3 +395,45 @@ class ShoppingCartSerializer(serializers.ModelSerializer):
             'user',
             'recipe',
         )
+
+
+class RecipeBatchSerializer(serializers.Serializer):
+    """
+    Сериализатор списка id рецептов для пакетного добавления
+    в избранное или корзину и удаления из них.
+    """
+    recipes = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=settings.BATCH_RECIPES_MAX,
+    )
+
+
+class CookableQuerySerializer(serializers.Serializer):
+    """
+    Сериализатор параметров поиска рецептов по имеющимся ингредиентам.
+    """
+    ingredients = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=settings.COOKABLE_INGREDIENTS_MAX,
+    )
+    max_missing = serializers.IntegerField(
+        min_value=0,
+        required=False,
+    )
+
+
+class CookableRecipeSerializer(SubscribeFavoriteRecipeSerializer):
+    """
+    Сериализатор рецепта с количеством имеющихся
+    и недостающих ингредиентов.
+    """
+    ingredients_available = serializers.IntegerField(read_only=True)
+    ingredients_missing = serializers.IntegerField(read_only=True)
+
+    class Meta(SubscribeFavoriteRecipeSerializer.Meta):
+        fields = SubscribeFavoriteRecipeSerializer.Meta.fields + (
+            'ingredients_available',
+            'ingredients_missing',
+        )
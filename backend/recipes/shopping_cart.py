@@ -0,0 +1,188 @@
+import csv
+import io
+import json
+
+from django.conf import settings
+from django.db.models import F, FloatField, Sum
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+from recipes.models import RecipeIngredient
+from recipes.units import get_base_unit, get_unit_factor, to_display_unit
+
+
+class ShoppingCartRenderer(BaseRenderer):
+    """
+    Базовый рендерер формата списка покупок.
+
+    Сам список отдается потоком из представления, поэтому рендерер
+    нужен для выбора формата через ?format= и для ответов с ошибками.
+    """
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return json.dumps(data, ensure_ascii=False).encode('utf-8')
+
+
+class TextShoppingCartRenderer(ShoppingCartRenderer):
+    media_type = 'text/plain'
+    format = 'txt'
+
+
+class CSVShoppingCartRenderer(ShoppingCartRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+
+class PDFShoppingCartRenderer(ShoppingCartRenderer):
+    media_type = 'application/pdf'
+    format = 'pdf'
+    charset = None
+
+
+SHOPPING_CART_RENDERERS = (
+    TextShoppingCartRenderer,
+    CSVShoppingCartRenderer,
+    JSONRenderer,
+    PDFShoppingCartRenderer,
+)
+
+
+def get_shopping_cart_ingredients(user):
+    """
+    Возвращает суммарное количество ингредиентов из корзины
+    пользователя, отсортированное по названию ингредиента.
+
+    Количество в переводимых единицах (кг, л, ложки) суммируется
+    в базовой единице (г или мл) в том же запросе.
+    """
+    recipe_ids = user.user_shopping_cart.values_list(
+        'recipe_id', flat=True
+    )
+    unit_field = 'ingredient__measurement_unit'
+    return RecipeIngredient.objects.filter(
+        recipe_id__in=recipe_ids
+    ).values(
+        name=F('ingredient__name'),
+        base_unit=get_base_unit(unit_field)
+    ).annotate(
+        total_amount=Sum(
+            F('amount') * get_unit_factor(unit_field),
+            output_field=FloatField()
+        )
+    ).order_by('name', 'base_unit')
+
+
+def iter_rows(ingredients):
+    """
+    Читает агрегированные ингредиенты серверным курсором
+    и переводит количество в удобные единицы.
+    """
+    for item in ingredients.iterator(
+        chunk_size=settings.SHOPPING_CART_CHUNK_SIZE
+    ):
+        amount, unit = to_display_unit(
+            item['total_amount'], item['base_unit']
+        )
+        yield {
+            'name': item['name'],
+            'amount': amount,
+            'measurement_unit': unit,
+        }
+
+
+def write_txt(ingredients):
+    yield 'Список покупок:\n'
+    for item in iter_rows(ingredients):
+        yield (
+            f'Наименование: {item["name"]}, '
+            f'Количество: {item["amount"]} '
+            f'{item["measurement_unit"]}\n'
+        )
+
+
+class Echo:
+    """
+    Псевдо-файл, который возвращает записанную строку вместо
+    ее сохранения.
+    """
+    def write(self, value):
+        return value
+
+
+def write_csv(ingredients):
+    writer = csv.writer(Echo())
+    yield writer.writerow(('name', 'amount', 'measurement_unit'))
+    for item in iter_rows(ingredients):
+        yield writer.writerow((
+            item['name'],
+            item['amount'],
+            item['measurement_unit'],
+        ))
+
+
+def write_json(ingredients):
+    yield '['
+    separator = ''
+    for item in iter_rows(ingredients):
+        yield separator + json.dumps(
+            {
+                'name': item['name'],
+                'amount': item['amount'],
+                'measurement_unit': item['measurement_unit'],
+            },
+            ensure_ascii=False
+        )
+        separator = ','
+    yield ']'
+
+
+def write_pdf(ingredients):
+    """
+    Формирует PDF-файл со списком покупок.
+
+    PDF нельзя отдать по частям до завершения документа, поэтому
+    строки читаются потоком, а файл отдается после сборки.
+    """
+    font_name = 'ShoppingCartFont'
+    if font_name not in pdfmetrics.getRegisteredFontNames():
+        pdfmetrics.registerFont(
+            TTFont(font_name, settings.SHOPPING_CART_PDF_FONT)
+        )
+    buffer = io.BytesIO()
+    page = canvas.Canvas(buffer, pagesize=A4)
+    width, height = A4
+    margin = 50
+    line_height = 18
+    page.setFont(font_name, 16)
+    y = height - margin
+    page.drawString(margin, y, 'Список покупок')
+    page.setFont(font_name, 12)
+    y -= line_height * 2
+    for item in iter_rows(ingredients):
+        if y < margin:
+            page.showPage()
+            page.setFont(font_name, 12)
+            y = height - margin
+        page.drawString(
+            margin,
+            y,
+            f'{item["name"]} — {item["amount"]} '
+            f'{item["measurement_unit"]}'
+        )
+        y -= line_height
+    page.save()
+    yield buffer.getvalue()
+
+
+SHOPPING_CART_WRITERS = {
+    'txt': write_txt,
+    'csv': write_csv,
+    'json': write_json,
+    'pdf': write_pdf,
+}
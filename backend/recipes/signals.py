@@ -0,0 +1,105 @@
+from django.db.models.signals import post_delete, post_init, post_save
+from django.db import transaction
+from django.dispatch import receiver
+
+from recipes.catalog import bump_catalog_version
+from recipes.cookable_index import publish_recipe_change
+from recipes.images import needs_variants
+from recipes.models import Ingredient, Recipe, Tag, TimelineEntry
+from recipes.search import update_search_vector
+from recipes.tasks import (fill_subscriber_timeline, generate_image_variants,
+                           push_to_timelines)
+from users.models import SubscribeUser
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+@receiver((post_save, post_delete), sender=Tag)
+def update_catalog_version(sender, **kwargs):
+    """
+    Меняет версию справочников после фиксации изменения тегов
+    и ингредиентов: иначе запрос до фиксации мог бы закэшировать
+    старые данные под новой версией. Индекс ингредиентов
+    перестраивается при смене версии.
+    """
+    transaction.on_commit(bump_catalog_version)
+
+
+SEARCH_FIELDS = ('name', 'text')
+
+
+def get_search_state(instance):
+    return tuple(instance.__dict__.get(field) for field in SEARCH_FIELDS)
+
+
+@receiver(post_init, sender=Recipe)
+def remember_search_state(sender, instance, **kwargs):
+    instance._search_state = get_search_state(instance)
+
+
+@receiver(post_save, sender=Recipe)
+def update_recipe_search_vector(sender, instance, created, update_fields,
+                                **kwargs):
+    """
+    Обновляет поисковый вектор рецепта после сохранения,
+    если изменились название или текст.
+    """
+    if update_fields is not None and not set(SEARCH_FIELDS) & set(
+        update_fields
+    ):
+        return
+    state = get_search_state(instance)
+    changed = created or state != instance._search_state
+    instance._search_state = state
+    if changed:
+        update_search_vector(Recipe.objects.filter(pk=instance.pk))
+
+
+@receiver(post_save, sender=Recipe)
+def update_recipe_image_variants(sender, instance, **kwargs):
+    """
+    Запускает создание вариантов изображения рецепта,
+    если изображение изменилось.
+    """
+    if needs_variants(instance):
+        generate_image_variants.enqueue(instance.pk)
+
+
+@receiver(post_save, sender=Recipe)
+def push_recipe_to_timelines(sender, instance, created, **kwargs):
+    """
+    Ставит в очередь рассылку нового рецепта по лентам подписчиков.
+    """
+    if created:
+        push_to_timelines.enqueue(instance.pk)
+
+
+@receiver((post_save, post_delete), sender=Recipe)
+def update_cookable_index(sender, instance, **kwargs):
+    """
+    Записывает изменение состава рецепта после фиксации транзакции,
+    когда ингредиенты рецепта уже сохранены.
+    """
+    recipe_id = instance.pk
+    transaction.on_commit(lambda: publish_recipe_change(recipe_id))
+
+
+@receiver(post_save, sender=SubscribeUser)
+def fill_timeline_on_subscribe(sender, instance, created, **kwargs):
+    """
+    Добавляет в ленту рецепты автора после подписки на него.
+    """
+    if created:
+        fill_subscriber_timeline.enqueue(
+            instance.subscriber_id, instance.target_user_id
+        )
+
+
+@receiver(post_delete, sender=SubscribeUser)
+def clear_timeline_on_unsubscribe(sender, instance, **kwargs):
+    """
+    Убирает из ленты рецепты автора после отписки от него.
+    """
+    TimelineEntry.objects.filter(
+        user_id=instance.subscriber_id,
+        recipe__author_id=instance.target_user_id
+    ).delete()
@@ -0,0 +1,191 @@
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, OuterRef, Subquery
+from scipy import sparse
+
+from recipes.models import Recipe, RecipeIngredient, SimilarRecipe
+
+
+def load_pairs(queryset, field):
+    """
+    Возвращает массив пар (id рецепта, id признака).
+    """
+    return np.array(
+        list(queryset.values_list('recipe_id', field).iterator()),
+        dtype=np.int64
+    ).reshape(-1, 2)
+
+
+def get_candidates(recipe_ids):
+    """
+    Возвращает id переданных рецептов и не больше
+    SIMILAR_CANDIDATES_MAX рецептов с наибольшим числом общих
+    с ними ингредиентов. Частые ингредиенты (соль, вода) есть
+    почти во всех рецептах, поэтому без ограничения кандидатами
+    стал бы весь каталог. Полный пересчет выполняет периодическая
+    задача update_all_similar_recipes.
+    """
+    candidates = RecipeIngredient.objects.filter(
+        ingredient_id__in=RecipeIngredient.objects.filter(
+            recipe_id__in=recipe_ids
+        ).values('ingredient_id')
+    ).exclude(
+        recipe_id__in=recipe_ids
+    ).values('recipe_id').annotate(
+        shared=Count('id')
+    ).order_by('-shared', '-recipe_id').values_list(
+        'recipe_id', flat=True
+    )[:settings.SIMILAR_CANDIDATES_MAX]
+    return set(recipe_ids) | set(candidates)
+
+
+def build_matrix(recipe_ids=None):
+    """
+    Строит разреженную матрицу рецепт x (ингредиенты + теги)
+    с нормированными строками: произведение строк равно
+    косинусной мере сходства рецептов.
+
+    Если переданы recipe_ids, в матрицу попадают только переданные
+    рецепты и кандидаты из get_candidates.
+
+    Возвращает массив id рецептов (по строкам) и матрицу.
+    """
+    ingredients = RecipeIngredient.objects.all()
+    tags = Recipe.tags.through.objects.all()
+    if recipe_ids is not None:
+        candidates = get_candidates(recipe_ids)
+        ingredients = ingredients.filter(recipe_id__in=candidates)
+        tags = tags.filter(recipe_id__in=candidates)
+    ingredient_pairs = load_pairs(ingredients, 'ingredient_id')
+    tag_pairs = load_pairs(tags, 'tag_id')
+
+    ids, rows = np.unique(
+        np.concatenate((ingredient_pairs[:, 0], tag_pairs[:, 0])),
+        return_inverse=True
+    )
+    ingredient_ids, ingredient_columns = np.unique(
+        ingredient_pairs[:, 1], return_inverse=True
+    )
+    _, tag_columns = np.unique(tag_pairs[:, 1], return_inverse=True)
+    columns = np.concatenate(
+        (ingredient_columns, tag_columns + len(ingredient_ids))
+    )
+    data = np.concatenate((
+        np.ones(len(ingredient_pairs), dtype=np.float32),
+        np.full(
+            len(tag_pairs), settings.SIMILAR_TAG_WEIGHT, dtype=np.float32
+        ),
+    ))
+    matrix = sparse.csr_matrix(
+        (data, (rows, columns)),
+        shape=(len(ids), columns.max(initial=-1) + 1),
+        dtype=np.float32
+    )
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)))
+    norms[norms == 0] = 1
+    return ids, sparse.csr_matrix(matrix.multiply(1 / norms))
+
+
+def iter_neighbours(ids, matrix, rows, top_k, block_size):
+    """
+    Выдает по блокам строк id рецептов блока и список
+    (id рецепта, id похожего, сходство) для top_k самых похожих.
+    Сходство блока со всеми рецептами считается одним
+    умножением разреженных матриц, результат остается разреженным:
+    top_k выбирается только среди рецептов с общими ингредиентами
+    или тегами.
+    """
+    top_k = min(top_k, len(ids) - 1)
+    if top_k <= 0:
+        return
+    transposed = matrix.T.tocsr()
+    for start in range(0, len(rows), block_size):
+        block = rows[start:start + block_size]
+        scores = sparse.csr_matrix(matrix[block] @ transposed)
+        neighbours = []
+        for position, row in enumerate(block):
+            begin, end = scores.indptr[position], scores.indptr[position + 1]
+            columns = scores.indices[begin:end]
+            row_scores = scores.data[begin:end]
+            keep = (columns != row) & (row_scores > 0)
+            columns, row_scores = columns[keep], row_scores[keep]
+            if len(columns) > top_k:
+                top = np.argpartition(-row_scores, top_k - 1)[:top_k]
+                columns, row_scores = columns[top], row_scores[top]
+            order = np.argsort(-row_scores, kind='stable')
+            neighbours += [
+                (int(ids[row]), int(ids[column]), float(score))
+                for column, score in zip(
+                    columns[order], row_scores[order]
+                )
+            ]
+        yield ids[block].tolist(), neighbours
+
+
+def trim_neighbours(recipe_ids, top_k):
+    """
+    Оставляет у рецептов не больше top_k самых похожих.
+    """
+    cutoff = SimilarRecipe.objects.filter(
+        recipe=OuterRef('recipe')
+    ).order_by('-score').values('score')[top_k - 1:top_k]
+    SimilarRecipe.objects.filter(
+        recipe_id__in=recipe_ids,
+        score__lt=Subquery(cutoff)
+    ).delete()
+
+
+def update_similar(recipe_ids=None, top_k=None, block_size=None):
+    """
+    Пересчитывает похожие рецепты.
+
+    Без recipe_ids пересчитываются все рецепты. С recipe_ids
+    пересчитываются только они, а у найденных соседей пара
+    добавляется в обратную сторону, если проходит в их top_k.
+    Возвращает количество сохраненных пар.
+    """
+    top_k = top_k or settings.SIMILAR_RECIPES_COUNT
+    block_size = block_size or settings.SIMILAR_BLOCK_SIZE
+    ids, matrix = build_matrix(recipe_ids)
+    if recipe_ids is None:
+        rows = np.arange(len(ids))
+        SimilarRecipe.objects.exclude(
+            recipe_id__in=RecipeIngredient.objects.values('recipe_id')
+        ).delete()
+    else:
+        rows = np.flatnonzero(np.isin(ids, list(recipe_ids)))
+        with transaction.atomic():
+            SimilarRecipe.objects.filter(recipe_id__in=recipe_ids).delete()
+            SimilarRecipe.objects.filter(similar_id__in=recipe_ids).delete()
+
+    saved = 0
+    blocks = iter_neighbours(ids, matrix, rows, top_k, block_size)
+    for block_ids, neighbours in blocks:
+        with transaction.atomic():
+            if recipe_ids is None:
+                SimilarRecipe.objects.filter(
+                    recipe_id__in=block_ids
+                ).delete()
+            SimilarRecipe.objects.bulk_create(
+                (
+                    SimilarRecipe(recipe_id=recipe_id,
+                                  similar_id=similar_id, score=score)
+                    for recipe_id, similar_id, score in neighbours
+                ),
+                ignore_conflicts=True
+            )
+            if recipe_ids is not None:
+                SimilarRecipe.objects.bulk_create(
+                    (
+                        SimilarRecipe(recipe_id=similar_id,
+                                      similar_id=recipe_id, score=score)
+                        for recipe_id, similar_id, score in neighbours
+                    ),
+                    ignore_conflicts=True
+                )
+                trim_neighbours(
+                    {similar_id for _, similar_id, _ in neighbours}, top_k
+                )
+        saved += len(neighbours)
+    return saved
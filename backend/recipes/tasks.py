@@ -0,0 +1,47 @@
+from django.conf import settings
+
+from recipes.feed import fan_out_recipe, fill_timeline
+from recipes.images import generate_recipe_variants
+from recipes.similarity import update_similar
+from tasks.queue import task
+
+
+@task
+def generate_image_variants(recipe_id):
+    """
+    Создает уменьшенные копии изображения рецепта.
+    """
+    generate_recipe_variants(recipe_id)
+
+
+@task
+def push_to_timelines(recipe_id):
+    """
+    Добавляет новый рецепт в ленты подписчиков автора.
+    """
+    fan_out_recipe(recipe_id)
+
+
+@task
+def fill_subscriber_timeline(user_id, author_id):
+    """
+    Добавляет в ленту нового подписчика последние рецепты автора.
+    """
+    fill_timeline(user_id, (author_id,))
+
+
+@task
+def update_similar_recipes(recipe_id):
+    """
+    Пересчитывает похожие рецепты для измененного рецепта.
+    """
+    update_similar((recipe_id,))
+
+
+@task(interval=settings.SIMILAR_UPDATE_INTERVAL)
+def update_all_similar_recipes():
+    """
+    Периодически пересчитывает похожие рецепты для всего каталога:
+    при изменении рецепта пересчет идет только по части кандидатов.
+    """
+    update_similar()
@@ -0,0 +1,85 @@
+from django.db.models import Case, CharField, F, FloatField, Value, When
+
+# Единицы измерения из data/ingredients.csv, которые можно перевести
+# друг в друга: единица -> (базовая единица, множитель).
+UNITS = {
+    'г': ('г', 1),
+    'кг': ('г', 1000),
+    'мл': ('мл', 1),
+    'л': ('мл', 1000),
+    'ч. л.': ('мл', 5),
+    'ст. л.': ('мл', 15),
+    'стакан': ('мл', 250),
+    'капля': ('мл', 0.05),
+}
+
+# Единицы для вывода: (единица, множитель, минимальное количество
+# в базовых единицах). Выбирается первая подходящая.
+DISPLAY_UNITS = {
+    'г': (
+        ('кг', 1000, 1000),
+        ('г', 1, 0),
+    ),
+    'мл': (
+        ('л', 1000, 1000),
+        ('мл', 1, 100),
+        ('ст. л.', 15, 15),
+        ('ч. л.', 5, 5),
+        ('мл', 1, 0),
+    ),
+}
+
+
+def get_base_unit(field):
+    """
+    Выражение базовой единицы для поля с единицей измерения.
+    Единицы без пересчета остаются как есть.
+    """
+    return Case(
+        *(
+            When(**{field: unit}, then=Value(base_unit))
+            for unit, (base_unit, _) in UNITS.items()
+        ),
+        default=F(field),
+        output_field=CharField()
+    )
+
+
+def get_unit_factor(field):
+    """
+    Выражение множителя для перевода в базовую единицу.
+    """
+    return Case(
+        *(
+            When(**{field: unit}, then=Value(float(factor)))
+            for unit, (_, factor) in UNITS.items()
+        ),
+        default=Value(1.0),
+        output_field=FloatField()
+    )
+
+
+def round_amount(value):
+    """
+    Округляет количество до двух значащих знаков после запятой
+    для малых значений и до целых для больших.
+    """
+    if value >= 100:
+        digits = 0
+    elif value >= 10:
+        digits = 1
+    else:
+        digits = 2
+    value = round(value, digits)
+    return int(value) if value == int(value) else value
+
+
+def to_display_unit(amount, base_unit):
+    """
+    Переводит количество в базовых единицах в удобную для чтения
+    единицу. Возвращает (количество, единица).
+    """
+    for unit, factor, minimum in DISPLAY_UNITS.get(base_unit, ()):
+        if amount >= minimum:
+            return round_amount(amount / factor), unit
+    return round_amount(amount), base_unit
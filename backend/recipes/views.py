@@ -1,31 +1,46 @@
+import os
+
 from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Exists, F, OuterRef
+from django.db.models.functions import Greatest
 from django.shortcuts import get_object_or_404
-from django.http import HttpResponse
+from django.http import StreamingHttpResponse
 from http import HTTPStatus
 from rest_framework import viewsets
 from rest_framework.decorators import action
-from rest_framework.permissions import IsAuthenticatedOrReadOnly
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.permissions import (IsAuthenticated,
+                                        IsAuthenticatedOrReadOnly)
 from rest_framework.response import Response
-from django.db.models import Sum, F
 
+from api.middleware import ServerTimingMixin, time_serializer
+from recipes.catalog import CatalogCacheMixin
+from recipes.cookable_index import cookable_index
+from recipes.feed import FeedPagination
 from recipes.filters import RecipesFilter, IngredientsFilter
+from recipes.ingredient_index import ingredient_index
 from recipes.models import (Ingredient,
                             FavoriteRecipe,
-                            RecipeIngredient,
                             Recipe, Tag,
                             ShoppingCart)
+from recipes.pagination import LimitPageNumberPagination, RecipePagination
 from recipes.serializers import (RecipeSerializer,
+                                 CookableQuerySerializer,
+                                 CookableRecipeSerializer,
                                  CreateRecipeSerializer,
                                  FavoriteSerializer,
                                  IngredientSerializer,
+                                 RecipeBatchSerializer,
                                  TagSerializer)
+from recipes.shopping_cart import (SHOPPING_CART_RENDERERS,
+                                   SHOPPING_CART_WRITERS,
+                                   get_shopping_cart_ingredients)
 from users.permissions import AuthorOrAdminCanEditPermission
 from users.serializers import SubscribeFavoriteRecipeSerializer
 
-TEXT_PLAIN_CONTENT_TYPE = 'text/plain'
-
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(ServerTimingMixin, viewsets.ModelViewSet):
     """
     Класс представления для модели Recipe.
     """
@@ -34,13 +49,19 @@ class RecipeViewSet(viewsets.ModelViewSet):
         AuthorOrAdminCanEditPermission,
     )
     filterset_class = RecipesFilter
+    pagination_class = RecipePagination
 
     def get_queryset(self):
         """
-        Возвращает отсортированный по дате публикации queryset рецептов.
+        Возвращает отсортированный по дате публикации queryset рецептов
+        с флагами избранного и корзины для текущего пользователя.
+        Для чтения связанные объекты подгружаются заранее.
         """
-        queryset = Recipe.objects.all()
-        return queryset.order_by('-pub_date')
+        user = self.request.user
+        queryset = Recipe.objects.with_user_flags(user)
+        if self.action in ('list', 'retrieve', 'feed'):
+            queryset = queryset.with_related(user)
+        return queryset.order_by('-pub_date', '-id')
 
     def get_serializer_class(self):
         """
@@ -50,6 +71,62 @@ class RecipeViewSet(viewsets.ModelViewSet):
             return RecipeSerializer
         return CreateRecipeSerializer
 
+    def update_favorites_count(self, model, recipe_ids, delta):
+        """
+        Изменяет счетчик добавлений рецептов в избранное.
+        """
+        if model is not FavoriteRecipe or not delta or not recipe_ids:
+            return
+        Recipe.objects.filter(pk__in=recipe_ids).update(
+            favorites_count=Greatest(F('favorites_count') + delta, 0)
+        )
+
+    def insert_user_recipes(self, model, user, recipe_ids):
+        """
+        Добавляет пользователю рецепты в FavoriteRecipe или ShoppingCart,
+        пропуская уже добавленные, и возвращает id вставленных:
+        рецептов, которые после вставки есть у пользователя.
+        Вызывается в транзакции после проверки, что рецептов еще нет.
+        """
+        if not recipe_ids:
+            return set()
+        try:
+            with transaction.atomic():
+                model.objects.bulk_create(
+                    (model(user=user, recipe_id=recipe_id)
+                     for recipe_id in recipe_ids),
+                    ignore_conflicts=True
+                )
+                # Внешние ключи проверяются при фиксации транзакции,
+                # проверка здесь превращает удаленный рецепт в 400.
+                connection.check_constraints(
+                    table_names=(model._meta.db_table,)
+                )
+        except IntegrityError:
+            raise ValidationError(
+                {'recipes': 'Рецепт удален во время запроса.'}
+            )
+        return set(model.objects.filter(
+            user=user,
+            recipe_id__in=recipe_ids
+        ).values_list('recipe_id', flat=True))
+
+    def delete_user_recipes(self, model, user, recipe_ids):
+        """
+        Удаляет у пользователя рецепты из FavoriteRecipe или ShoppingCart
+        и возвращает id действительно удаленных. Строки блокируются
+        до удаления, поэтому параллельный запрос их уже не удалит.
+        """
+        if not recipe_ids:
+            return set()
+        queryset = model.objects.filter(user=user, recipe_id__in=recipe_ids)
+        deleted = set(
+            queryset.select_for_update().values_list('recipe_id', flat=True)
+        )
+        queryset.filter(recipe_id__in=deleted).delete()
+        return deleted
+
+    @transaction.atomic
     def favorite_shopping_cart_creator(self, model, request, pk):
         """
         Создает или удаляет объект модели FavoriteRecipe или ShoppingCart
@@ -74,7 +151,10 @@ class RecipeViewSet(viewsets.ModelViewSet):
                 user=user,
                 recipe=recipe
             )
-            serializer = SubscribeFavoriteRecipeSerializer(recipe)
+            self.update_favorites_count(model, (recipe.pk,), 1)
+            serializer = time_serializer(
+                request, SubscribeFavoriteRecipeSerializer(recipe)
+            )
             return Response(
                 serializer.data,
                 status=HTTPStatus.CREATED
@@ -88,12 +168,66 @@ class RecipeViewSet(viewsets.ModelViewSet):
                     status=HTTPStatus.BAD_REQUEST
                 )
 
-            model.objects.filter(
+            deleted, _ = model.objects.filter(
                 user=user,
                 recipe=recipe
             ).delete()
+            self.update_favorites_count(model, (recipe.pk,), -deleted)
             return Response(status=HTTPStatus.NO_CONTENT)
 
+    @transaction.atomic
+    def favorite_shopping_cart_batch(self, model, request):
+        """
+        Добавляет в FavoriteRecipe или ShoppingCart несколько рецептов
+        или удаляет их. Возвращает результат для каждого id:
+        added, exists, deleted, absent или not_found.
+        """
+        serializer = RecipeBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        recipe_ids = list(dict.fromkeys(
+            serializer.validated_data['recipes']
+        ))
+        user = request.user
+        in_list = dict(
+            Recipe.objects.filter(id__in=recipe_ids).annotate(
+                in_list=Exists(model.objects.filter(
+                    user=user,
+                    recipe=OuterRef('pk')
+                ))
+            ).values_list('id', 'in_list')
+        )
+
+        if request.method == 'POST':
+            changed = self.insert_user_recipes(model, user, [
+                recipe_id for recipe_id, exists in in_list.items()
+                if not exists
+            ])
+            self.update_favorites_count(model, changed, 1)
+            statuses = {True: 'added', False: 'exists'}
+        else:
+            changed = self.delete_user_recipes(model, user, [
+                recipe_id for recipe_id, exists in in_list.items()
+                if exists
+            ])
+            self.update_favorites_count(model, changed, -1)
+            statuses = {True: 'deleted', False: 'absent'}
+
+        return Response(
+            {
+                'recipes': [
+                    {
+                        'id': recipe_id,
+                        'status': (
+                            statuses[recipe_id in changed]
+                            if recipe_id in in_list else 'not_found'
+                        ),
+                    }
+                    for recipe_id in recipe_ids
+                ]
+            },
+            status=HTTPStatus.OK
+        )
+
     @action(
         detail=True,
         methods=('POST', 'DELETE'),
@@ -106,6 +240,19 @@ class RecipeViewSet(viewsets.ModelViewSet):
             FavoriteRecipe, request, pk
         )
 
+    @action(
+        detail=False,
+        methods=('POST', 'DELETE'),
+        url_path='favorite',
+        url_name='favorite-batch',
+        permission_classes=(IsAuthenticated,),
+    )
+    def favorite_batch(self, request):
+        """
+        Добавляет или удаляет из избранного несколько рецептов.
+        """
+        return self.favorite_shopping_cart_batch(FavoriteRecipe, request)
+
     @action(detail=False, methods=('GET',))
     def favorites(self, request):
         """
@@ -113,10 +260,10 @@ class RecipeViewSet(viewsets.ModelViewSet):
         """
         user = request.user
         favorites = user.user_favorite_recipes.all()
-        serializer = FavoriteSerializer(
+        serializer = time_serializer(request, FavoriteSerializer(
             favorites,
             many=True
-        )
+        ))
         return Response(
             serializer.data, status=HTTPStatus.OK
         )
@@ -135,44 +282,120 @@ class RecipeViewSet(viewsets.ModelViewSet):
 
     @action(
         detail=False,
-        methods=('GET',)
+        methods=('POST', 'DELETE'),
+        url_path='shopping_cart',
+        url_name='shopping-cart-batch',
+        permission_classes=(IsAuthenticated,),
+    )
+    def shopping_cart_batch(self, request):
+        """
+        Добавляет или удаляет из списка покупок несколько рецептов.
+        """
+        return self.favorite_shopping_cart_batch(ShoppingCart, request)
+
+    @action(
+        detail=False,
+        methods=('GET',),
+        pagination_class=LimitPageNumberPagination,
     )
-    def download_shopping_cart(self, request):
+    def cookable(self, request):
         """
-        Скачивает список покупок в виде текстового файла.
+        Возвращает рецепты, которые можно приготовить из ингредиентов
+        ?ingredients=, по возрастанию числа недостающих ингредиентов.
+        ?max_missing= ограничивает число недостающих.
         """
-        user = request.user
-        queryset = ShoppingCart.objects.filter(
-            user=user
+        params = CookableQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        recipe_ids, available, missing = cookable_index.search(
+            params.validated_data['ingredients'],
+            params.validated_data.get('max_missing'),
         )
-        recipe_ids = queryset.values_list(
-            'recipe_id', flat=True
+        page = self.paginate_queryset(
+            list(zip(recipe_ids, available, missing))
         )
-        ingredients = RecipeIngredient.objects.filter(
-            recipe_id__in=recipe_ids
-        ).values(
-            name=F('ingredient__name'),
-            measurement_unit=F('ingredient__measurement_unit')
-        ).annotate(total_amount=Sum('amount'))
-
-        shopping_cart = 'Список покупок:\n'
-        for item in ingredients:
-            shopping_cart += (
-                f'Наименование: {item["name"]}, '
-                f'Количество: {item["total_amount"]} '
-                f'{item["measurement_unit"]}\n'
+        recipes = Recipe.objects.in_bulk(
+            [recipe_id for recipe_id, _, _ in page]
+        )
+        results = []
+        for recipe_id, recipe_available, recipe_missing in page:
+            recipe = recipes.get(recipe_id)
+            if recipe is None:
+                continue
+            recipe.ingredients_available = recipe_available
+            recipe.ingredients_missing = recipe_missing
+            results.append(recipe)
+        serializer = time_serializer(request, CookableRecipeSerializer(
+            results,
+            many=True,
+            context={'request': request}
+        ))
+        return self.get_paginated_response(serializer.data)
+
+    @action(detail=True, methods=('GET',))
+    def similar(self, request, pk):
+        """
+        Возвращает рецепты, похожие по ингредиентам и тегам.
+        Список заранее рассчитан командой update_similar_recipes.
+        """
+        recipes = Recipe.objects.filter(
+            similar_to__recipe_id=pk
+        ).order_by('-similar_to__score')
+        if not recipes and not Recipe.objects.filter(pk=pk).exists():
+            raise NotFound
+        serializer = time_serializer(
+            request,
+            SubscribeFavoriteRecipeSerializer(
+                recipes,
+                many=True,
+                context={'request': request}
             )
-        response = HttpResponse(
-            shopping_cart, content_type=TEXT_PLAIN_CONTENT_TYPE
         )
+        return Response(serializer.data, status=HTTPStatus.OK)
+
+    @action(
+        detail=False,
+        methods=('GET',),
+        permission_classes=(IsAuthenticated,),
+        pagination_class=FeedPagination,
+    )
+    def feed(self, request):
+        """
+        Возвращает новые рецепты авторов, на которых подписан
+        пользователь. Страницы переключаются курсором ?cursor=.
+        """
+        page = self.paginate_queryset(self.get_queryset())
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @action(
+        detail=False,
+        methods=('GET',),
+        permission_classes=(IsAuthenticated,),
+        renderer_classes=SHOPPING_CART_RENDERERS,
+    )
+    def download_shopping_cart(self, request):
+        """
+        Скачивает список покупок в формате txt, csv, json или pdf.
+        Формат выбирается параметром ?format=, по умолчанию txt.
+        """
+        renderer = request.accepted_renderer
+        ingredients = get_shopping_cart_ingredients(request.user)
+        content_type = renderer.media_type
+        if renderer.charset:
+            content_type += f'; charset={renderer.charset}'
+        response = StreamingHttpResponse(
+            SHOPPING_CART_WRITERS[renderer.format](ingredients),
+            content_type=content_type
+        )
+        filename = os.path.splitext(settings.SHOPPING_CART_FILENAME)[0]
         response['Content-Disposition'] = (
-            f'attachment; filename={settings.SHOPPING_CART_FILENAME}'
+            f'attachment; filename={filename}.{renderer.format}'
         )
-
         return response
 
 
-class IngredientsViewSet(viewsets.ModelViewSet):
+class IngredientsViewSet(CatalogCacheMixin, ServerTimingMixin,
+                         viewsets.ModelViewSet):
     """
     Класс представления для модели Ingredient.
     """
@@ -182,8 +405,41 @@ class IngredientsViewSet(viewsets.ModelViewSet):
     filterset_class = IngredientsFilter
     pagination_class = None
 
+    def get_limit(self):
+        """
+        Возвращает ограничение количества ингредиентов из ?limit=,
+        без параметра - INGREDIENTS_LIMIT_MAX.
+        """
+        limit = self.request.query_params.get('limit')
+        if limit is None:
+            return settings.INGREDIENTS_LIMIT_MAX
+        try:
+            limit = int(limit)
+        except ValueError:
+            limit = 0
+        if limit < 1:
+            raise ValidationError(
+                {'limit': 'Должно быть положительным целым числом.'}
+            )
+        return min(limit, settings.INGREDIENTS_LIMIT_MAX)
+
+    def list(self, request, *args, **kwargs):
+        return self.get_catalog_response(self.search, request)
+
+    def search(self, request):
+        """
+        Возвращает ингредиенты из индекса в памяти без запросов к БД.
+        Сначала идут ингредиенты, название которых начинается с ?name=.
+        """
+        return Response(
+            ingredient_index.search(
+                request.query_params.get('name'),
+                self.get_limit()
+            )
+        )
+
 
-class TagViewSet(viewsets.ModelViewSet):
+class TagViewSet(CatalogCacheMixin, ServerTimingMixin, viewsets.ModelViewSet):
     """
     Класс представления для модели Tag.
     """
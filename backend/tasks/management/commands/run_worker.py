@@ -0,0 +1,89 @@
+import signal
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.core.management import BaseCommand
+from django.db import close_old_connections
+
+from tasks.queue import claim_tasks, run_task, schedule_periodic
+
+
+def process(claimed):
+    """
+    Выполняет задачу в потоке обработчика. У каждого потока свое
+    соединение с БД, оно закрывается по правилам CONN_MAX_AGE.
+    """
+    close_old_connections()
+    try:
+        run_task(claimed)
+    finally:
+        close_old_connections()
+
+
+class Command(BaseCommand):
+    """
+    Команда для запуска обработчика отложенных задач.
+    """
+    help = (
+        'Забирает задачи из таблицы tasks_task и выполняет их '
+        'в пуле потоков.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=settings.TASK_WORKERS,
+            help='Количество потоков.'
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=settings.TASK_POLL_INTERVAL,
+            help='Пауза между опросами пустой очереди, с.'
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Выполнить готовые задачи и завершить работу.'
+        )
+
+    def handle(self, *args, **options):
+        workers = options['workers']
+        stopping = threading.Event()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda *args: stopping.set())
+
+        processed = 0
+        running = set()
+        with ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix='task-worker'
+        ) as executor:
+            next_schedule = 0
+            while not stopping.is_set():
+                if not options['once'] and time.monotonic() >= next_schedule:
+                    schedule_periodic()
+                    next_schedule = (
+                        time.monotonic() + settings.TASK_SCHEDULE_INTERVAL
+                    )
+                claimed = []
+                if len(running) < workers:
+                    claimed = claim_tasks(workers - len(running))
+                    close_old_connections()
+                running.update(
+                    executor.submit(process, task) for task in claimed
+                )
+                processed += len(claimed)
+                if running:
+                    _, running = wait(
+                        running,
+                        timeout=options['poll_interval'],
+                        return_when=FIRST_COMPLETED
+                    )
+                elif options['once']:
+                    break
+                else:
+                    stopping.wait(options['poll_interval'])
+        self.stdout.write(f'Обработано задач: {processed}.')
@@ -0,0 +1,99 @@
+from django.db import models
+from django.utils import timezone
+
+
+class Task(models.Model):
+    """
+    Модель отложенной задачи.
+
+    Поля:
+    - name: Имя зарегистрированной функции (CharField)
+    - args: Позиционные аргументы (JSONField)
+    - kwargs: Именованные аргументы (JSONField)
+    - status: Состояние задачи (CharField)
+    - attempts: Количество запусков (PositiveSmallIntegerField)
+    - max_attempts: Допустимое количество запусков
+      (PositiveSmallIntegerField)
+    - run_at: Время, не раньше которого задачу можно запускать
+      (DateTimeField)
+    - created: Дата создания (DateTimeField)
+    - started: Время последнего запуска (DateTimeField)
+    - finished: Время завершения (DateTimeField)
+    - error: Ошибка последнего запуска (TextField)
+    """
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (PENDING, 'Ожидает'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Выполнена'),
+        (FAILED, 'Ошибка'),
+    )
+
+    name = models.CharField(
+        max_length=200,
+        verbose_name='Задача',
+    )
+    args = models.JSONField(
+        default=list,
+        blank=True,
+        verbose_name='Позиционные аргументы',
+    )
+    kwargs = models.JSONField(
+        default=dict,
+        blank=True,
+        verbose_name='Именованные аргументы',
+    )
+    status = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default=PENDING,
+        verbose_name='Состояние',
+    )
+    attempts = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name='Количество запусков',
+    )
+    max_attempts = models.PositiveSmallIntegerField(
+        default=1,
+        verbose_name='Допустимое количество запусков',
+    )
+    run_at = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Запустить не раньше',
+    )
+    created = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Дата создания',
+    )
+    started = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Время запуска',
+    )
+    finished = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Время завершения',
+    )
+    error = models.TextField(
+        blank=True,
+        verbose_name='Ошибка',
+    )
+
+    class Meta:
+        indexes = (
+            models.Index(
+                fields=('status', 'run_at'),
+                name='task_status_run_at_idx'
+            ),
+            models.Index(
+                fields=('name', 'status'),
+                name='task_name_status_idx'
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.name} ({self.get_status_display()})'
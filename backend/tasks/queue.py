@@ -0,0 +1,186 @@
+import logging
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from tasks.models import Task
+
+logger = logging.getLogger(__name__)
+
+registry = {}
+
+periodic = {}
+
+
+def task(func=None, *, max_attempts=None, interval=None):
+    """
+    Регистрирует функцию как задачу. Добавляет функции метод
+    enqueue для постановки в очередь после фиксации транзакции.
+
+    Аргументы задачи сохраняются в JSON, поэтому передавать
+    нужно идентификаторы, а не объекты моделей.
+
+    Задача с interval (в секундах) без аргументов запускается
+    обработчиком периодически, см. schedule_periodic.
+    """
+    def decorator(func):
+        name = f'{func.__module__}.{func.__name__}'
+        registry[name] = func
+        if interval:
+            periodic[name] = interval
+        func.task_name = name
+        func.max_attempts = max_attempts or settings.TASK_MAX_ATTEMPTS
+        func.enqueue = lambda *args, **kwargs: enqueue(func, *args, **kwargs)
+        return func
+
+    if func is not None:
+        return decorator(func)
+    return decorator
+
+
+def enqueue(func, *args, **kwargs):
+    """
+    Ставит задачу в очередь после фиксации текущей транзакции:
+    если транзакция будет отменена, задача не появится.
+    """
+    transaction.on_commit(lambda: Task.objects.create(
+        name=func.task_name,
+        args=list(args),
+        kwargs=kwargs,
+        max_attempts=func.max_attempts,
+    ))
+
+
+def schedule_periodic():
+    """
+    Ставит в очередь периодические задачи, у которых нет
+    ожидающего или выполняемого запуска. Следующий запуск
+    назначается через interval после завершения предыдущего.
+    """
+    now = timezone.now()
+    for name, interval in periodic.items():
+        runs = Task.objects.filter(name=name)
+        if runs.filter(status__in=(Task.PENDING, Task.RUNNING)).exists():
+            continue
+        last_finished = runs.exclude(finished=None).order_by(
+            '-finished'
+        ).values_list('finished', flat=True).first()
+        Task.objects.create(
+            name=name,
+            max_attempts=registry[name].max_attempts,
+            run_at=(
+                last_finished + timedelta(seconds=interval)
+                if last_finished else now
+            ),
+        )
+
+
+def purge_tasks():
+    """
+    Удаляет выполненные и упавшие задачи, завершенные раньше
+    TASK_RETENTION секунд назад, порциями по TASK_PURGE_BATCH_SIZE.
+    Возвращает количество удаленных задач.
+    """
+    finished = Task.objects.filter(
+        status__in=(Task.DONE, Task.FAILED),
+        finished__lt=timezone.now() - timedelta(
+            seconds=settings.TASK_RETENTION
+        ),
+    )
+    purged = 0
+    while True:
+        ids = list(finished.values_list('id', flat=True)[
+            :settings.TASK_PURGE_BATCH_SIZE
+        ])
+        if not ids:
+            return purged
+        purged += Task.objects.filter(id__in=ids).delete()[0]
+
+
+def claim_tasks(limit):
+    """
+    Забирает до limit готовых к запуску задач и помечает их
+    выполняемыми. Строки, заблокированные другими обработчиками,
+    пропускаются (SELECT ... FOR UPDATE SKIP LOCKED).
+
+    Задачи, зависшие в состоянии running дольше TASK_TIMEOUT
+    (например, после падения обработчика), забираются повторно,
+    пока не исчерпаны попытки, после чего помечаются failed:
+    задача, которая роняет обработчик, не перезапускается бесконечно.
+    """
+    now = timezone.now()
+    stale = now - timedelta(seconds=settings.TASK_TIMEOUT)
+    with transaction.atomic():
+        Task.objects.filter(
+            status=Task.RUNNING,
+            started__lt=stale,
+            attempts__gte=F('max_attempts'),
+        ).update(
+            status=Task.FAILED,
+            finished=now,
+            error='Превышено время выполнения задачи.',
+        )
+        tasks = list(
+            Task.objects.select_for_update(skip_locked=True).filter(
+                Q(status=Task.PENDING, run_at__lte=now)
+                | Q(
+                    status=Task.RUNNING,
+                    started__lt=stale,
+                    attempts__lt=F('max_attempts'),
+                )
+            ).order_by('run_at', 'id')[:limit]
+        )
+        for claimed in tasks:
+            claimed.status = Task.RUNNING
+            claimed.attempts += 1
+            claimed.started = now
+        Task.objects.bulk_update(tasks, ('status', 'attempts', 'started'))
+    return tasks
+
+
+def get_retry_delay(attempts):
+    """
+    Возвращает паузу перед повтором: TASK_RETRY_DELAY,
+    удваивающаяся с каждой неудачной попыткой.
+    """
+    return timedelta(
+        seconds=settings.TASK_RETRY_DELAY * 2 ** (attempts - 1)
+    )
+
+
+def run_task(claimed):
+    """
+    Выполняет задачу и сохраняет результат. При ошибке задача
+    возвращается в очередь, пока не исчерпаны попытки.
+    """
+    try:
+        func = registry.get(claimed.name)
+        if func is None:
+            raise LookupError(f'Неизвестная задача: {claimed.name}.')
+        func(*claimed.args, **claimed.kwargs)
+    except Exception:
+        logger.exception('Ошибка задачи %s (%s).', claimed.id, claimed.name)
+        claimed.error = traceback.format_exc()
+        if claimed.attempts < claimed.max_attempts:
+            claimed.status = Task.PENDING
+            claimed.run_at = timezone.now() + get_retry_delay(
+                claimed.attempts
+            )
+        else:
+            claimed.status = Task.FAILED
+            claimed.finished = timezone.now()
+    else:
+        claimed.status = Task.DONE
+        claimed.error = ''
+        claimed.finished = timezone.now()
+    finally:
+        Task.objects.filter(pk=claimed.pk).update(
+            status=claimed.status,
+            run_at=claimed.run_at,
+            finished=claimed.finished,
+            error=claimed.error,
+        )
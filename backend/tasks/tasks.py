@@ -0,0 +1,11 @@
+from django.conf import settings
+
+from tasks.queue import purge_tasks, task
+
+
+@task(interval=settings.TASK_PURGE_INTERVAL)
+def purge_finished_tasks():
+    """
+    Удаляет из очереди старые выполненные и упавшие задачи.
+    """
+    purge_tasks()
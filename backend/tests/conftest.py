@@ -0,0 +1,79 @@
+import pytest
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
+from users.models import User
+
+
+@pytest.fixture
+def user(db):
+    return User.objects.create_user(
+        email='cook@foodgram.ru',
+        username='cook',
+        first_name='Иван',
+        last_name='Иванов',
+        password='Pass-12345',
+    )
+
+
+@pytest.fixture
+def author(db):
+    return User.objects.create_user(
+        email='author@foodgram.ru',
+        username='author',
+        first_name='Петр',
+        last_name='Петров',
+        password='Pass-12345',
+    )
+
+
+@pytest.fixture
+def user_client(user):
+    token, _ = Token.objects.get_or_create(user=user)
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+    return client
+
+
+@pytest.fixture
+def tags(db):
+    return [
+        Tag.objects.create(name=name, color=color, slug=slug)
+        for name, color, slug in (
+            ('Завтрак', '#E26C2D', 'breakfast'),
+            ('Обед', '#49B64E', 'lunch'),
+            ('Ужин', '#8775D2', 'dinner'),
+        )
+    ]
+
+
+@pytest.fixture
+def ingredients(db):
+    return [
+        Ingredient.objects.create(name=f'ингредиент {number}',
+                                  measurement_unit='г')
+        for number in range(10)
+    ]
+
+
+@pytest.fixture
+def create_recipe(db):
+    """
+    Создает рецепт с переданными тегами и ингредиентами.
+    """
+    def create(author, name, tags, ingredients):
+        recipe = Recipe.objects.create(
+            author=author,
+            name=name,
+            text=f'Рецепт {name}',
+            cooking_time=10,
+            image='recipesphoto/test.jpg',
+        )
+        recipe.tags.set(tags)
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(recipe=recipe, ingredient=ingredient, amount=10)
+            for ingredient in ingredients
+        )
+        return recipe
+    return create
@@ -0,0 +1,108 @@
+import pytest
+
+from django.db import connection
+
+from recipes.management.commands.explain_queries import (Command,
+                                                         find_seq_scans,
+                                                         get_view_queryset)
+from recipes.models import FavoriteRecipe, ShoppingCart
+from recipes.views import RecipeViewSet
+
+
+@pytest.fixture
+def recipes(user, author, tags, ingredients, create_recipe):
+    """
+    Рецепты с разными тегами: избранное - 0, 1, 2, 3,
+    корзина - 2, 3, 4, 5.
+    """
+    breakfast, lunch, _ = tags
+    recipes = [
+        create_recipe(
+            author, f'Рецепт {number}',
+            [breakfast] if number % 2 else [lunch],
+            ingredients[:2]
+        )
+        for number in range(6)
+    ]
+    FavoriteRecipe.objects.bulk_create(
+        FavoriteRecipe(user=user, recipe=recipe) for recipe in recipes[:4]
+    )
+    ShoppingCart.objects.bulk_create(
+        ShoppingCart(user=user, recipe=recipe) for recipe in recipes[2:]
+    )
+    return recipes
+
+
+@pytest.mark.parametrize('query, expected', (
+    ('is_favorited=1', (3, 2, 1, 0)),
+    ('is_in_shopping_cart=1', (5, 4, 3, 2)),
+    ('is_favorited=1&is_in_shopping_cart=1', (3, 2)),
+    ('is_favorited=1&tags=breakfast', (3, 1)),
+    ('is_in_shopping_cart=1&tags=breakfast', (5, 3)),
+    ('is_favorited=1&is_in_shopping_cart=1&tags=lunch', (2,)),
+    ('is_favorited=1&tags=breakfast&tags=lunch', (3, 2, 1, 0)),
+    ('is_favorited=0', (5, 4, 3, 2, 1, 0)),
+))
+def test_user_recipes_filters(user_client, recipes, query, expected):
+    """
+    Фильтры избранного и корзины сочетаются друг с другом и с тегами,
+    сохраняя сортировку от новых к старым.
+    """
+    response = user_client.get(f'/api/recipes/?limit=50&{query}')
+
+    assert response.status_code == 200
+    assert [recipe['id'] for recipe in response.json()['results']] == [
+        recipes[number].id for number in expected
+    ]
+
+
+def test_user_recipes_filters_by_author(user_client, user, recipes):
+    """
+    Фильтры сочетаются с фильтром по автору.
+    """
+    response = user_client.get(
+        f'/api/recipes/?is_favorited=1&author={user.id}'
+    )
+
+    assert response.json()['results'] == []
+
+
+@pytest.mark.parametrize('params', (
+    {'is_favorited': 1},
+    {'is_in_shopping_cart': 1},
+    {'is_favorited': 1, 'is_in_shopping_cart': 1},
+    {'is_favorited': 1, 'tags': ['breakfast', 'lunch']},
+    {'is_favorited': 1, 'is_in_shopping_cart': 1, 'tags': ['breakfast']},
+))
+def test_user_recipes_filters_sql(user, recipes, params):
+    """
+    Фильтры добавляют к запросу подзапросы EXISTS без соединений
+    и DISTINCT.
+    """
+    queryset = get_view_queryset(RecipeViewSet, 'list', user, params)
+    sql = str(queryset.query).upper()
+
+    filters_count = sum(
+        name in params
+        for name in ('tags', 'is_favorited', 'is_in_shopping_cart')
+    )
+    # Два EXISTS - флаги is_favorited и is_in_shopping_cart в выдаче.
+    assert sql.count('EXISTS') == 2 + filters_count
+    assert 'JOIN' not in sql
+    assert 'DISTINCT' not in sql
+
+
+def test_user_recipes_filters_plan(user, recipes):
+    """
+    План запроса со всеми фильтрами не читает таблицы целиком.
+    """
+    queryset = get_view_queryset(RecipeViewSet, 'list', user, {
+        'is_favorited': 1,
+        'is_in_shopping_cart': 1,
+        'tags': ['breakfast'],
+        'author': recipes[0].author_id,
+    })[:6]
+
+    plan = Command().explain(queryset)
+
+    assert find_seq_scans(plan, connection.vendor) == [], plan
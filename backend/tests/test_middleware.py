@@ -0,0 +1,38 @@
+import logging
+
+from django.test import override_settings
+
+
+def get_metrics(response):
+    return dict(
+        metric.split(';dur=')
+        for metric in response['Server-Timing'].split(', ')
+    )
+
+
+def test_no_timing_headers_by_default(user_client):
+    assert 'Server-Timing' not in user_client.get('/api/recipes/')
+
+
+def test_timing_headers_for_staff(user, user_client, author, tags,
+                                  ingredients, create_recipe):
+    user.is_staff = True
+    user.save()
+    create_recipe(author, 'Суп', tags, ingredients)
+    response = user_client.get('/api/recipes/')
+    assert response.status_code == 200
+    assert set(get_metrics(response)) == {
+        'db', 'serialize', 'view', 'render', 'total'
+    }
+    assert int(response['X-DB-Queries']) > 0
+
+
+@override_settings(QUERY_BUDGET=0)
+def test_over_budget_requests_are_logged(user_client, caplog):
+    """
+    Запросы сверх QUERY_BUDGET пишутся в лог и без заголовков.
+    """
+    with caplog.at_level(logging.WARNING, logger='foodgram.performance'):
+        response = user_client.get('/api/recipes/')
+    assert 'Server-Timing' not in response
+    assert 'RecipeViewSet.list' in caplog.text
@@ -0,0 +1,224 @@
+import warnings
+from unittest import mock
+from urllib.parse import urlencode
+
+from django.core.paginator import UnorderedObjectListWarning
+from django.db import connection
+from django.db.models import F
+from django.test.utils import CaptureQueriesContext
+import pytest
+from rest_framework.exceptions import ValidationError
+
+from recipes.models import FavoriteRecipe, Recipe
+from recipes.serializers import CreateRecipeSerializer
+from recipes.views import RecipeViewSet
+from users.authentication import token_cache
+from users.models import SubscribeUser
+
+
+def fill_recipes(create_recipe, author, tags, ingredients, count, start=0):
+    for number in range(start, start + count):
+        create_recipe(author, f'Рецепт {number}', tags, ingredients)
+
+
+def test_recipes_list_query_count_is_constant(
+    user_client, author, tags, ingredients, create_recipe,
+    django_assert_num_queries
+):
+    """
+    Число запросов списка рецептов не зависит от количества рецептов
+    на странице и ингредиентов в них.
+    """
+    fill_recipes(create_recipe, author, tags[:1], ingredients[:2], 2)
+    token_cache.clear()
+    with CaptureQueriesContext(connection) as queries:
+        response = user_client.get('/api/recipes/?limit=50')
+    assert response.status_code == 200
+    assert len(response.json()['results']) == 2
+
+    fill_recipes(create_recipe, author, tags, ingredients, 20, start=2)
+    token_cache.clear()
+    with django_assert_num_queries(len(queries)):
+        response = user_client.get('/api/recipes/?limit=50')
+    results = response.json()['results']
+    assert len(results) == 22
+    assert len(results[0]['ingredients']) == len(ingredients)
+    assert len(results[0]['tags']) == len(tags)
+
+
+def test_subscriptions_are_ordered(
+    user, user_client, author, django_user_model
+):
+    """
+    Подписки выдаются по username, страницы не пересекаются.
+    """
+    authors = [author] + [
+        django_user_model.objects.create_user(
+            email=f'author{number}@foodgram.ru',
+            username=f'author{number}',
+            first_name='Автор',
+            last_name='Авторов',
+            password='Pass-12345',
+        )
+        for number in range(7)
+    ]
+    SubscribeUser.objects.bulk_create(
+        SubscribeUser(subscriber=user, target_user=target)
+        for target in authors
+    )
+
+    usernames = []
+    with warnings.catch_warnings():
+        warnings.simplefilter('error', UnorderedObjectListWarning)
+        for page in (1, 2):
+            response = user_client.get(
+                f'/api/users/subscriptions/?page={page}'
+            )
+            usernames += [
+                item['username'] for item in response.json()['results']
+            ]
+
+    assert usernames == sorted(target.username for target in authors)
+
+
+def test_recipes_cursor_with_pub_date_ordering(
+    user_client, author, tags, ingredients, create_recipe
+):
+    """
+    Курсорная пагинация работает с ?ordering=-pub_date и обходит
+    все рецепты без повторов.
+    """
+    fill_recipes(create_recipe, author, tags, ingredients, 3)
+    response = user_client.get(
+        '/api/recipes/?cursor=&limit=2&ordering=-pub_date'
+    )
+    assert response.status_code == 200
+    first = response.json()
+    second = user_client.get(first['next']).json()
+    ids = [
+        recipe['id'] for recipe in first['results'] + second['results']
+    ]
+    assert ids == sorted(ids, reverse=True)
+    assert len(ids) == 3
+    assert second['next'] is None
+
+
+def test_recipes_invalid_cursor(user_client):
+    response = user_client.get('/api/recipes/?cursor=invalid')
+    assert response.status_code == 400
+    assert 'cursor' in response.json()
+
+
+def test_favorite_batch_counts_only_changed_rows(
+    user, user_client, author, tags, ingredients, create_recipe
+):
+    """
+    Счетчик избранного меняется только для действительно
+    вставленных и удаленных строк.
+    """
+    first, second = (
+        create_recipe(author, name, tags, ingredients)
+        for name in ('Первый', 'Второй')
+    )
+    FavoriteRecipe.objects.create(user=user, recipe=first)
+    view = RecipeViewSet()
+    assert view.insert_user_recipes(
+        FavoriteRecipe, user, [second.id]
+    ) == {second.id}
+    assert view.delete_user_recipes(
+        FavoriteRecipe, user, [first.id]
+    ) == {first.id}
+
+    response = user_client.post(
+        '/api/recipes/favorite/',
+        {'recipes': [first.id, second.id]},
+        format='json'
+    )
+    assert response.status_code == 200
+    assert response.json()['recipes'] == [
+        {'id': first.id, 'status': 'added'},
+        {'id': second.id, 'status': 'exists'},
+    ]
+    counts = dict(Recipe.objects.values_list('id', 'favorites_count'))
+    assert counts == {first.id: 1, second.id: 0}
+
+
+def test_search_pages_cover_all_matches(
+    user_client, author, tags, ingredients, create_recipe
+):
+    """
+    Страницы поиска выдают все найденные рецепты по релевантности,
+    count - число всех найденных рецептов.
+    """
+    fill_recipes(create_recipe, author, tags, ingredients[:1], 5)
+    create_recipe(author, 'Борщ', tags, ingredients[:1])
+    names = []
+    url = '/api/recipes/?' + urlencode({'search': 'рецепт', 'limit': 2})
+    while url:
+        response = user_client.get(url).json()
+        assert response['count'] == 6
+        names += [recipe['name'] for recipe in response['results']]
+        url = response['next']
+    assert names == [f'Рецепт {number}' for number in range(4, -1, -1)] + [
+        'Борщ'
+    ]
+
+
+def test_search_with_cursor_is_rejected(user_client):
+    response = user_client.get(
+        '/api/recipes/?' + urlencode({'search': 'суп', 'cursor': ''})
+    )
+    assert response.status_code == 400
+    assert 'cursor' in response.json()
+
+
+def test_search_vector_updated_only_on_text_change(
+    author, tags, ingredients, create_recipe
+):
+    recipe = create_recipe(author, 'Суп', tags, ingredients[:1])
+    with mock.patch('recipes.signals.update_search_vector') as update:
+        recipe.cooking_time = 20
+        recipe.save()
+        update.assert_not_called()
+        recipe.name = 'Суп с клецками'
+        recipe.save()
+        update.assert_called_once()
+
+
+def test_favorite_batch_deleted_recipe(
+    user, author, tags, ingredients, create_recipe
+):
+    """
+    Рецепт, удаленный между проверкой и вставкой, дает 400, а не 500.
+    """
+    recipe = create_recipe(author, 'Удаленный', tags, ingredients)
+    recipe_id = recipe.id
+    recipe.delete()
+    with pytest.raises(ValidationError):
+        RecipeViewSet().insert_user_recipes(
+            FavoriteRecipe, user, [recipe_id]
+        )
+    assert not FavoriteRecipe.objects.exists()
+
+
+def test_recipe_update_keeps_favorites_count(
+    author, tags, ingredients, create_recipe
+):
+    """
+    Изменение рецепта не перезаписывает счетчик избранного
+    и варианты изображения, измененные после чтения рецепта.
+    """
+    recipe = create_recipe(author, 'Суп', tags, ingredients[:1])
+    Recipe.objects.filter(pk=recipe.pk).update(
+        favorites_count=F('favorites_count') + 5,
+        image_variants={'source': recipe.image.name},
+    )
+    CreateRecipeSerializer().update(recipe, {
+        'ingredients': [{'id': ingredients[0].id, 'amount': 10}],
+        'tags': tags,
+        'name': 'Суп с клецками',
+    })
+    recipe.refresh_from_db()
+    assert recipe.name == 'Суп с клецками'
+    assert recipe.favorites_count == 5
+    assert recipe.image_variants == {'source': recipe.image.name}
@@ -0,0 +1,92 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from tasks.models import Task
+from tasks.queue import claim_tasks, purge_tasks, schedule_periodic
+
+
+def create_stale_task(attempts, max_attempts):
+    started = timezone.now() - timedelta(seconds=settings.TASK_TIMEOUT + 1)
+    return Task.objects.create(
+        name='recipes.tasks.generate_image_variants',
+        args=[1],
+        status=Task.RUNNING,
+        attempts=attempts,
+        max_attempts=max_attempts,
+        started=started,
+    )
+
+
+def test_stale_task_is_reclaimed(db):
+    """
+    Зависшая задача с оставшимися попытками забирается повторно.
+    """
+    stale = create_stale_task(attempts=1, max_attempts=3)
+
+    claimed = claim_tasks(10)
+
+    assert [task.pk for task in claimed] == [stale.pk]
+    stale.refresh_from_db()
+    assert stale.status == Task.RUNNING
+    assert stale.attempts == 2
+
+
+def test_stale_task_without_attempts_fails(db):
+    """
+    Зависшая задача без оставшихся попыток помечается failed
+    и больше не забирается.
+    """
+    stale = create_stale_task(attempts=3, max_attempts=3)
+
+    assert claim_tasks(10) == []
+    stale.refresh_from_db()
+    assert stale.status == Task.FAILED
+    assert stale.finished is not None
+    assert claim_tasks(10) == []
+
+
+def test_periodic_task_is_scheduled_once(db):
+    """
+    Периодическая задача ставится в очередь один раз, следующий
+    запуск - через interval после завершения предыдущего.
+    """
+    name = 'recipes.tasks.update_all_similar_recipes'
+
+    schedule_periodic()
+    schedule_periodic()
+
+    scheduled = Task.objects.get(name=name)
+    finished = timezone.now()
+    Task.objects.filter(pk=scheduled.pk).update(
+        status=Task.DONE, finished=finished
+    )
+    schedule_periodic()
+
+    next_run = Task.objects.get(name=name, status=Task.PENDING)
+    assert next_run.run_at == finished + timedelta(
+        seconds=settings.SIMILAR_UPDATE_INTERVAL
+    )
+
+
+def test_old_finished_tasks_are_purged(db, settings):
+    """
+    Удаляются только завершенные задачи старше TASK_RETENTION.
+    """
+    settings.TASK_PURGE_BATCH_SIZE = 2
+    old = timezone.now() - timedelta(seconds=settings.TASK_RETENTION + 1)
+    purged = [
+        Task.objects.create(name='old', status=status, finished=old)
+        for status in (Task.DONE, Task.FAILED, Task.DONE)
+    ]
+    kept = [
+        Task.objects.create(name='recent', status=Task.DONE,
+                            finished=timezone.now()),
+        Task.objects.create(name='pending', status=Task.PENDING),
+    ]
+
+    assert purge_tasks() == len(purged)
+    assert list(
+        Task.objects.order_by('id').values_list('id', flat=True)
+    ) == [task.pk for task in kept]
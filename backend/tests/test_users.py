@@ -0,0 +1,80 @@
+from django.test import override_settings
+import pytest
+
+from users.authentication import bump_token_version, token_cache
+
+ME_URL = '/api/users/me/'
+
+
+@pytest.fixture(autouse=True)
+def clear_token_cache():
+    token_cache.clear()
+    yield
+    token_cache.clear()
+
+
+def get_stats(client):
+    assert client.get(ME_URL).status_code == 200
+    stats = token_cache.stats()
+    return stats['hits'], stats['misses']
+
+
+def test_token_cache_hit_and_miss(user_client):
+    """
+    Первый запрос загружает токен из БД, следующие берут его из кэша.
+    """
+    assert get_stats(user_client) == (0, 1)
+    assert get_stats(user_client) == (1, 1)
+
+
+def test_logout_invalidates_token(
+    user_client, django_capture_on_commit_callbacks
+):
+    assert user_client.get(ME_URL).status_code == 200
+    with django_capture_on_commit_callbacks(execute=True):
+        response = user_client.post('/api/auth/token/logout/')
+    assert response.status_code == 204
+    assert user_client.get(ME_URL).status_code == 401
+
+
+def test_password_change_invalidates_token(
+    user, user_client, django_capture_on_commit_callbacks
+):
+    assert get_stats(user_client) == (0, 1)
+    with django_capture_on_commit_callbacks(execute=True):
+        response = user_client.post(
+            '/api/users/set_password/',
+            {'current_password': 'Pass-12345',
+             'new_password': 'New-pass-67890'},
+        )
+    assert response.status_code == 204
+    _, misses = get_stats(user_client)
+    assert misses == 2
+    user.refresh_from_db()
+    assert token_cache.get(
+        user.auth_token.key
+    ).user.password == user.password
+
+
+def test_deactivation_invalidates_token(
+    user, user_client, django_capture_on_commit_callbacks
+):
+    assert user_client.get(ME_URL).status_code == 200
+    user.is_active = False
+    with django_capture_on_commit_callbacks(execute=True):
+        user.save()
+    assert user_client.get(ME_URL).status_code == 401
+
+
+@override_settings(CACHE_SHARED=True, TOKEN_VERSION_CHECK_INTERVAL=0)
+def test_shared_cache_version_invalidates_other_processes(
+    user, user_client
+):
+    """
+    Смена версии токена в общем кэше (например, другим процессом)
+    сбрасывает запись кэша процесса.
+    """
+    assert get_stats(user_client) == (0, 1)
+    assert get_stats(user_client) == (1, 1)
+    bump_token_version(user.auth_token.key)
+    assert get_stats(user_client) == (1, 2)
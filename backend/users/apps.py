@@ -7,3 +7,6 @@ class UsersConfig(AppConfig):
     """
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'users'
+
+    def ready(self):
+        import users.signals  # noqa: F401
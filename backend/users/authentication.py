@@ -0,0 +1,159 @@
+import copy
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.authentication import TokenAuthentication
+
+TOKEN_VERSION_KEY = 'auth:token:{}:version'
+
+
+def get_token_version(key):
+    """
+    Возвращает версию токена из общего кэша.
+    """
+    return cache.get(TOKEN_VERSION_KEY.format(key))
+
+
+def bump_token_version(key):
+    """
+    Меняет версию токена: его записи в кэшах всех процессов
+    перестают действовать.
+
+    Ключ версии живет дольше записей (TOKEN_CACHE_TIMEOUT), поэтому
+    к его истечению все записи со старой версией тоже истекают.
+    """
+    cache.set(
+        TOKEN_VERSION_KEY.format(key),
+        uuid.uuid4().hex,
+        settings.TOKEN_CACHE_TIMEOUT * 2
+    )
+
+
+class TokenCache:
+    """
+    LRU-кэш токенов авторизации в памяти процесса.
+
+    Хранит не больше TOKEN_CACHE_SIZE последних использованных
+    токенов, каждый не дольше TOKEN_CACHE_TIMEOUT секунд. Выход,
+    удаление токена, смена пароля и деактивация сбрасывают запись
+    в процессе, где они произошли.
+
+    С общим кэшем (CACHE_SHARED) вместе с токеном запоминается его
+    версия из общего кэша: запись действует, пока версия не
+    изменилась. Версия проверяется не чаще раза
+    в TOKEN_VERSION_CHECK_INTERVAL секунд, поэтому попадания обычно
+    обходятся без обращения к общему кэшу, а другие процессы видят
+    изменения не позже, чем через этот интервал. Без
+    общего кэша другие процессы видят изменения не позже, чем
+    через TOKEN_CACHE_TIMEOUT секунд.
+
+    hits и misses - счетчики попаданий и промахов процесса.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get_entry(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, version, checked, token = entry
+            if expires <= now:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+        if (
+            not settings.CACHE_SHARED
+            or now - checked < settings.TOKEN_VERSION_CHECK_INTERVAL
+        ):
+            return token
+        if version != get_token_version(key):
+            self.delete(key)
+            return None
+        with self._lock:
+            if self._entries.get(key) is entry:
+                self._entries[key] = (expires, version, now, token)
+        return token
+
+    def get(self, key):
+        """
+        Возвращает копию токена с пользователем или None: объекты
+        из кэша не передаются в запросы, которые могут их изменить.
+        """
+        token = self.get_entry(key)
+        with self._lock:
+            if token is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        token = copy.copy(token)
+        token.user = copy.copy(token.user)
+        return token
+
+    def set(self, key, token, version=None):
+        """
+        Сохраняет копию токена с версией, прочитанной до загрузки
+        токена из БД, вытесняя давно не использованные.
+        """
+        token = copy.copy(token)
+        token.user = copy.copy(token.user)
+        now = time.monotonic()
+        with self._lock:
+            self._entries[key] = (
+                now + settings.TOKEN_CACHE_TIMEOUT,
+                version,
+                now,
+                token,
+            )
+            self._entries.move_to_end(key)
+            while len(self._entries) > settings.TOKEN_CACHE_SIZE:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        """
+        Возвращает счетчики попаданий, промахов и размер кэша процесса.
+        """
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self._entries),
+            }
+
+
+token_cache = TokenCache()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Авторизация по токену с кэшированием токена и пользователя.
+    Запрос к БД выполняется только при промахе кэша. Записи
+    сбрасываются сигналами users.signals.
+    """
+    def authenticate_credentials(self, key):
+        token = token_cache.get(key)
+        if token is None:
+            version = (
+                get_token_version(key) if settings.CACHE_SHARED else None
+            )
+            _, token = super().authenticate_credentials(key)
+            token_cache.set(key, token, version)
+        return token.user, token
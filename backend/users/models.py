@@ -1,10 +1,62 @@
 from django.db import models
-from django.contrib.auth.models import AbstractUser, Group, Permission
+from django.db.models import Count, Exists, OuterRef, Prefetch, Subquery
+from django.contrib.auth.models import (AbstractUser, Group, Permission,
+                                        UserManager)
 from django.utils.translation import gettext_lazy as _
 
 from users.validators import username_validator
 
 
+class UserQuerySet(models.QuerySet):
+    """
+    QuerySet пользователей.
+    """
+    def with_is_subscribed(self, user):
+        """
+        Добавляет к пользователям флаг is_subscribed: подписан ли
+        на них переданный пользователь.
+        """
+        if user.is_anonymous:
+            return self
+        return self.annotate(
+            is_subscribed=Exists(
+                SubscribeUser.objects.filter(
+                    subscriber=user,
+                    target_user=OuterRef('pk')
+                )
+            )
+        )
+
+    def with_recipes(self, limit=None):
+        """
+        Добавляет к пользователям количество их рецептов (recipes_count)
+        и подгружает не более limit последних рецептов каждого автора
+        в атрибут limited_recipes.
+        """
+        from recipes.models import Recipe
+
+        recipes = Recipe.objects.order_by('-pub_date', '-id')
+        if limit is not None:
+            recipes = recipes.filter(
+                id__in=Subquery(
+                    Recipe.objects.filter(
+                        author=OuterRef('author')
+                    ).order_by('-pub_date', '-id').values('id')[:limit]
+                )
+            )
+        return self.annotate(
+            recipes_count=Count('recipes')
+        ).prefetch_related(
+            Prefetch('recipes', queryset=recipes, to_attr='limited_recipes')
+        )
+
+
+class CustomUserManager(UserManager.from_queryset(UserQuerySet)):
+    """
+    Менеджер пользователей с методами UserQuerySet.
+    """
+
+
 class User(AbstractUser):
     """
     Модель пользователя.
@@ -73,6 +125,8 @@ class User(AbstractUser):
         related_name='in_shopping_cart_of_users'
     )
 
+    objects = CustomUserManager()
+
     class Meta:
         ordering = ('username',)
         verbose_name = 'Пользователь'
@@ -118,6 +172,12 @@ class SubscribeUser(models.Model):
                 name='unique_user_subscribe'
             ),
         )
+        indexes = (
+            models.Index(
+                fields=('target_user', 'subscriber'),
+                name='subscribe_target_user_idx'
+            ),
+        )
 
     def __str__(self):
         return (
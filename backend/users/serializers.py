@@ -3,6 +3,7 @@ from rest_framework.fields import SerializerMethodField
 
 from djoser.serializers import UserSerializer, UserCreateSerializer
 
+from recipes.fields import ImageVariantsField
 from recipes.models import Recipe
 from users.models import User, SubscribeUser
 
@@ -18,6 +19,8 @@ class CustomUserSerializer(UserSerializer):
         Функция для получения значения поля is_subscribed.
         Проверяет, подписан ли текущий пользователь на данного пользователя.
         """
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         user = self.context.get('request').user
         if user.is_anonymous:
             return False
@@ -60,6 +63,7 @@ class SubscribeFavoriteRecipeSerializer(serializers.ModelSerializer):
     """
     Сериализатор для рецептов в избранном.
     """
+    image_variants = ImageVariantsField()
 
     class Meta:
         model = Recipe
@@ -67,28 +71,54 @@ class SubscribeFavoriteRecipeSerializer(serializers.ModelSerializer):
             'id',
             'name',
             'image',
+            'image_variants',
             'cooking_time',
         )
 
 
+def get_recipes_limit(request):
+    """
+    Возвращает ограничение количества рецептов из ?recipes_limit=.
+    """
+    try:
+        limit = int(request.query_params.get('recipes_limit'))
+    except (TypeError, ValueError):
+        return None
+    return limit if limit > 0 else None
+
+
 class SubscribeSerializer(CustomUserSerializer):
     """
     Сериализатор для представления подписок.
     """
     recipes_count = SerializerMethodField()
-    recipes = SubscribeFavoriteRecipeSerializer(
-        many=True,
-        read_only=True
-    )
+    recipes = SerializerMethodField()
+
+    def get_recipes(self, obj):
+        """
+        Функция для получения последних рецептов пользователя
+        с учетом параметра recipes_limit.
+        """
+        if hasattr(obj, 'limited_recipes'):
+            recipes = obj.limited_recipes
+        else:
+            recipes = obj.recipes.order_by('-pub_date', '-id')
+            limit = get_recipes_limit(self.context['request'])
+            if limit is not None:
+                recipes = recipes[:limit]
+        return SubscribeFavoriteRecipeSerializer(
+            recipes,
+            many=True,
+            context=self.context
+        ).data
 
     def get_recipes_count(self, obj):
         """
         Функция для получения количества рецептов пользователя.
         """
-        recipes = Recipe.objects.filter(
-            author=obj.id
-        )
-        return recipes.count()
+        if hasattr(obj, 'recipes_count'):
+            return obj.recipes_count
+        return obj.recipes.count()
 
     class Meta(CustomUserSerializer.Meta):
         fields = (
@@ -0,0 +1,69 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from users.authentication import bump_token_version, token_cache
+from users.models import User
+
+# Поля пользователя, изменение которых не сбрасывает кэш токенов:
+# last_login меняется при каждом входе.
+UNCACHED_USER_FIELDS = ('last_login',)
+
+
+def get_cached_user_state(instance):
+    """
+    Возвращает значения загруженных полей пользователя, которые
+    попадают в кэш токенов. Отложенные поля не загружаются.
+    """
+    return {
+        field.attname: instance.__dict__.get(field.attname)
+        for field in instance._meta.concrete_fields
+        if field.attname not in UNCACHED_USER_FIELDS
+    }
+
+
+def invalidate_tokens(keys):
+    """
+    Меняет версии токенов сразу и еще раз после фиксации
+    транзакции: параллельный запрос мог закэшировать токен
+    по еще не измененным данным.
+    """
+    def invalidate():
+        for key in keys:
+            token_cache.delete(key)
+            bump_token_version(key)
+
+    invalidate()
+    transaction.on_commit(invalidate)
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_deleted_token(sender, instance, **kwargs):
+    """
+    Сбрасывает кэш удаленного токена: выход из системы,
+    удаление токена и пользователя.
+    """
+    invalidate_tokens((instance.key,))
+
+
+@receiver(post_init, sender=User)
+def remember_user_state(sender, instance, **kwargs):
+    instance._cached_state = get_cached_user_state(instance)
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_tokens(sender, instance, created, **kwargs):
+    """
+    Сбрасывает кэш токенов пользователя, если изменились
+    закэшированные данные: пароль, активность, профиль.
+    Сохранение только last_login кэш не затрагивает.
+    """
+    state = get_cached_user_state(instance)
+    changed = state != instance._cached_state
+    instance._cached_state = state
+    if created or not changed:
+        return
+    invalidate_tokens(list(
+        Token.objects.filter(user=instance).values_list('key', flat=True)
+    ))
@@ -6,12 +6,14 @@ from rest_framework.response import Response
 
 from djoser.views import UserViewSet
 
+from api.middleware import ServerTimingMixin, time_serializer
 from users.models import User, SubscribeUser
 from users.permissions import CreateOrAuthenticatedUserPermission
-from users.serializers import CustomUserSerializer, SubscribeSerializer
+from users.serializers import (CustomUserSerializer, SubscribeSerializer,
+                               get_recipes_limit)
 
 
-class CustomUserViewSet(UserViewSet):
+class CustomUserViewSet(ServerTimingMixin, UserViewSet):
     """
     Класс представления пользователей.
 
@@ -23,6 +25,24 @@ class CustomUserViewSet(UserViewSet):
     serializer_class = CustomUserSerializer
     permission_classes = (CreateOrAuthenticatedUserPermission,)
 
+    def get_queryset(self):
+        """
+        Для списка подписок возвращает авторов, на которых подписан
+        пользователь, с количеством и последними рецептами.
+        Сортировка задается явно: в запросах с GROUP BY
+        Meta.ordering не применяется.
+        """
+        if self.action == 'subscriptions':
+            subscriber = self.request.user
+            return User.objects.filter(
+                subscribers__subscriber=subscriber
+            ).with_is_subscribed(
+                subscriber
+            ).with_recipes(
+                get_recipes_limit(self.request)
+            ).order_by('username', 'id')
+        return super().get_queryset()
+
     @action(
         detail=True,
         methods=('post', 'delete'),
@@ -52,11 +72,11 @@ class CustomUserViewSet(UserViewSet):
                 target_user=target_user
             )
             subscription.save()
-            serializer = SubscribeSerializer(
+            serializer = time_serializer(request, SubscribeSerializer(
                 target_user,
                 data=request.data,
                 context={'request': request}
-            )
+            ))
             serializer.is_valid(raise_exception=True)
             serializer.save()
             return Response(serializer.data, status=HTTPStatus.CREATED)
@@ -79,12 +99,10 @@ class CustomUserViewSet(UserViewSet):
         permission_classes=(IsAuthenticated,),
     )
     def subscriptions(self, request):
-        subscriber = request.user
-        queryset = User.objects.filter(subscribers__subscriber=subscriber)
-        page = self.paginate_queryset(queryset)
-        serializer = SubscribeSerializer(
+        page = self.paginate_queryset(self.get_queryset())
+        serializer = time_serializer(request, SubscribeSerializer(
             page,
             many=True,
             context={'request': request}
-        )
+        ))
         return self.get_paginated_response(serializer.data)